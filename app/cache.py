@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+from app import config
+
+
+def make_cache_key(data, options: dict) -> str:
+    """
+    Content address of an extraction: SHA-256 of the bytes + the extractor options.
+    `data` can be any bytes-like object (bytes, mmap, memoryview).
+    """
+    digest = hashlib.sha256(data)
+    digest.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache of extraction results.
+    1. Memory: LRU evicted by total payload size (compressed bytes).
+    2. Disk (optional): SQLite file that survives restarts.
+    Values are JSON-serializable dicts, stored zlib-compressed.
+    """
+
+    def __init__(self, max_bytes: int, db_path: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB)")
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row:
+                    blob = row[0]
+                    # Promote disk hits into the memory tier
+                    self._store_in_memory(key, blob)
+
+            if blob is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        return json.loads(zlib.decompress(blob))
+
+    def put(self, key: str, value: dict):
+        blob = zlib.compress(json.dumps(value).encode("utf-8"))
+        with self._lock:
+            self._store_in_memory(key, blob)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)", (key, blob))
+                self._db.commit()
+
+    def _store_in_memory(self, key: str, blob: bytes):
+        # Entries bigger than the whole budget only go to disk
+        if len(blob) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.current_bytes -= len(old)
+        self._entries[key] = blob
+        self.current_bytes += len(blob)
+
+        # Evict least recently used until we fit
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "memory_bytes": self.current_bytes,
+                "max_memory_bytes": self.max_bytes,
+                "disk_enabled": self._db is not None,
+            }
+
+
+result_cache = ResultCache(config.CACHE_MAX_BYTES, config.CACHE_DB_PATH or None)
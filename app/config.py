@@ -0,0 +1,124 @@
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    """Reads an integer setting from the environment, falling back to a default."""
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+# --- PDF PAGE PARALLELISM ---
+# Size of the process pool shared by every PDF extraction (<= 1 disables it)
+PDF_POOL_WORKERS = _env_int("PDF_POOL_WORKERS", os.cpu_count() or 1)
+# How many page batches ONE document may have in flight at the same time,
+# so a single huge PDF can't occupy the whole pool
+PDF_MAX_WORKERS_PER_DOC = _env_int("PDF_MAX_WORKERS_PER_DOC", 2)
+# Pages handed to a worker per task
+PDF_PAGES_PER_TASK = _env_int("PDF_PAGES_PER_TASK", 4)
+# Smaller documents are cheaper to process inline than to ship to a worker
+PDF_PARALLEL_MIN_PAGES = _env_int("PDF_PARALLEL_MIN_PAGES", 8)
+
+# --- RESULT CACHE ---
+# Set CACHE_ENABLED=0 to always re-extract
+CACHE_ENABLED = _env_int("CACHE_ENABLED", 1) == 1
+# Memory budget for cached results (compressed size)
+CACHE_MAX_BYTES = _env_int("CACHE_MAX_BYTES", 64 * 1024 * 1024)
+# Path of the SQLite file backing the on-disk tier (empty disables it)
+CACHE_DB_PATH = os.environ.get("CACHE_DB_PATH", "")
+
+# --- BACKGROUND JOBS ---
+# Worker threads draining the /api/jobs queue
+JOB_WORKERS = _env_int("JOB_WORKERS", 2)
+# Total size of uploads allowed to wait in the queue before new jobs get a 503
+JOB_MAX_QUEUED_BYTES = _env_int("JOB_MAX_QUEUED_BYTES", 200 * 1024 * 1024)
+# Seconds a finished job's result can still be fetched (0 keeps it until evicted otherwise)
+JOB_RESULT_TTL = _env_int("JOB_RESULT_TTL", 3600)
+# Total extracted text kept for finished jobs; past it the oldest results expire first (0 disables)
+JOB_RESULT_MAX_BYTES = _env_int("JOB_RESULT_MAX_BYTES", 256 * 1024 * 1024)
+
+# --- UPLOADS ---
+# Uploads larger than this are rejected with a 413 (0 disables the limit)
+MAX_UPLOAD_BYTES = _env_int("MAX_UPLOAD_BYTES", 100 * 1024 * 1024)
+# Where uploads are spooled before extraction (empty = system temp dir)
+UPLOAD_SPOOL_DIR = os.environ.get("UPLOAD_SPOOL_DIR", "")
+# How much of the file libmagic gets to see when detecting the MIME type
+MIME_SNIFF_BYTES = _env_int("MIME_SNIFF_BYTES", 64 * 1024)
+
+# --- TABLES ---
+# Rows per block when a CSV is parsed in chunks
+CSV_CHUNK_ROWS = _env_int("CSV_CHUNK_ROWS", 50000)
+# "pandas" (default) or "streaming" (read-only openpyxl, row by row) for .xlsx files
+XLSX_ENGINE = os.environ.get("XLSX_ENGINE", "pandas")
+
+# --- WORD ---
+# "streaming" (default: one iterparse pass over word/document.xml) or "python-docx"
+DOCX_ENGINE = os.environ.get("DOCX_ENGINE", "streaming")
+
+# --- HTML ---
+# "streaming" (default: incremental tokenizer, no tree) or "bs4" (BeautifulSoup)
+HTML_ENGINE = os.environ.get("HTML_ENGINE", "streaming")
+
+# --- /api/extract ADMISSION ---
+# Worker processes for non-PDF extractions (0 = run them on threads in the API process)
+EXTRACT_POOL_WORKERS = _env_int("EXTRACT_POOL_WORKERS", os.cpu_count() or 1)
+# Concurrent extractions per format: OCR-capable formats (PDF, DOCX, images) / the rest
+EXTRACT_HEAVY_CONCURRENCY = _env_int("EXTRACT_HEAVY_CONCURRENCY", 2)
+EXTRACT_LIGHT_CONCURRENCY = _env_int("EXTRACT_LIGHT_CONCURRENCY", 8)
+# Per-format overrides by file type, e.g. "pdf=4,png=1"
+EXTRACT_CONCURRENCY = {
+    name.strip(): int(limit)
+    for name, _, limit in (item.partition("=") for item in os.environ.get("EXTRACT_CONCURRENCY", "").split(","))
+    if name.strip() and limit.strip().isdigit()
+}
+# Requests allowed to wait for a slot per format; past that /api/extract answers 503
+EXTRACT_MAX_WAITING = _env_int("EXTRACT_MAX_WAITING", 16)
+# Retry-After (seconds) sent with those 503s
+EXTRACT_RETRY_AFTER = _env_int("EXTRACT_RETRY_AFTER", 5)
+
+# --- STARTUP ---
+# Comma-separated formats whose extractors are imported at startup instead of
+# on first use, e.g. "pdf,docx" or "all" (default: none, fastest cold start)
+WARMUP_FORMATS = [name.strip() for name in os.environ.get("WARMUP_FORMATS", "").split(",") if name.strip()]
+
+# --- OCR ---
+# "auto" (tesserocr when installed, else pytesseract), "tesserocr" or "pytesseract"
+OCR_ENGINE = os.environ.get("OCR_ENGINE", "auto")
+# Long-lived OCR workers (tesserocr processes / concurrent tesseract calls)
+OCR_WORKERS = _env_int("OCR_WORKERS", os.cpu_count() or 1)
+# Tesseract language(s) used by the tesserocr engine
+OCR_LANG = os.environ.get("OCR_LANG", "eng")
+# Image preprocessing before OCR, in order: downscale, deskew, then otsu or adaptive (or no threshold)
+OCR_PREPROCESS = [step.strip() for step in os.environ.get("OCR_PREPROCESS", "downscale,otsu").split(",") if step.strip()]
+# Resolution images are downscaled to (stated DPI, else a letter page at this DPI)
+OCR_TARGET_DPI = _env_int("OCR_TARGET_DPI", 300)
+# Images larger than this (pixels, after downscaling) are OCR'd in horizontal bands of about this size
+OCR_TILE_PIXELS = _env_int("OCR_TILE_PIXELS", 12_000_000)
+# Rows neighbouring bands share, so a text line cut at a band edge is read whole by one of them
+OCR_TILE_OVERLAP_PX = _env_int("OCR_TILE_OVERLAP_PX", 120)
+# Entries in the process-wide OCR dedup cache (repeated logos, letterheads...); 0 disables it
+OCR_CACHE_ENTRIES = _env_int("OCR_CACHE_ENTRIES", 2048)
+
+# --- BATCH UPLOADS ---
+# Files per /api/extract/batch request (zip members included)
+BATCH_MAX_FILES = _env_int("BATCH_MAX_FILES", 100)
+# Bytes per batch request once zips are expanded (all files together); 0 disables
+BATCH_MAX_BYTES = _env_int("BATCH_MAX_BYTES", 500 * 1024 * 1024)
+# Concurrent OCR-heavy files (PDF, DOCX, images) across all batches
+BATCH_HEAVY_WORKERS = _env_int("BATCH_HEAVY_WORKERS", max(1, (os.cpu_count() or 2) // 2))
+# Concurrent cheap files (CSV, TXT, HTML, XLSX) across all batches
+BATCH_LIGHT_WORKERS = _env_int("BATCH_LIGHT_WORKERS", 4)
+# Estimated peak RAM all batch files together may hold
+BATCH_MEMORY_BYTES = _env_int("BATCH_MEMORY_BYTES", 256 * 1024 * 1024)
+
+# --- SCANNED PDF PAGES ---
+# Resolution of the cheap pre-pass that detects blank pages and measures text size
+OCR_PREPASS_DPI = _env_int("OCR_PREPASS_DPI", 75)
+# Render DPI range for the real OCR pass (300 was the old fixed value)
+OCR_MIN_DPI = _env_int("OCR_MIN_DPI", 150)
+OCR_MAX_DPI = _env_int("OCR_MAX_DPI", 300)
+# Glyph height (px) the chosen DPI aims for
+OCR_TARGET_GLYPH_PX = _env_int("OCR_TARGET_GLYPH_PX", 20)
+# Pages with less ink than this (fraction of pixels, per million) are treated as blank
+OCR_BLANK_INK_PPM = _env_int("OCR_BLANK_INK_PPM", 1000)
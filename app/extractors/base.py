@@ -1,16 +1,159 @@
+import time
 from abc import ABC, abstractmethod
-from app.schemas import ExtractedUnit
-from typing import List
+from app.schemas import ExtractedUnit, UnitColumns
+from app.uploads import Source, as_buffer, open_source
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+
+class ExtractionLimits:
+    """
+    Optional bounds for one extraction (?pages=, ?sheets=, ?max_units=, ?max_time_ms=).
+    Extractors check them between pages / sheets / chunks, so parsing and OCR
+    stop as soon as a limit is reached instead of running to the end.
+    """
+
+    def __init__(self, pages: Optional[List[Tuple[int, int]]] = None, sheets: Optional[Iterable[str]] = None,
+                 max_units: Optional[int] = None, max_time_ms: Optional[int] = None):
+        # Inclusive 1-based page ranges, e.g. [(1, 5), (8, 8)]
+        self.pages = pages
+        self.sheets = set(sheets) if sheets else None
+        self.max_units = max_units
+        self.max_time_ms = max_time_ms
+        self._deadline = None
+
+    @staticmethod
+    def parse_pages(spec: str) -> List[Tuple[int, int]]:
+        """"1-5,8" -> [(1, 5), (8, 8)]; raises ValueError on anything else."""
+        ranges = []
+        for part in spec.split(","):
+            part = part.strip()
+            start, _, end = part.partition("-")
+            start, end = int(start), int(end or start)
+            if start < 1 or end < start:
+                raise ValueError(f"Invalid page range: {part}")
+            ranges.append((start, end))
+        return ranges
+
+    def wants_page(self, number: int) -> bool:
+        return self.pages is None or any(start <= number <= end for start, end in self.pages)
+
+    def wants_sheet(self, name: str) -> bool:
+        return self.sheets is None or name in self.sheets
+
+    def cache_options(self) -> dict:
+        """The limits that change the result, for the cache key."""
+        options = {"pages": self.pages, "sheets": sorted(self.sheets) if self.sheets else None,
+                   "max_units": self.max_units, "max_time_ms": self.max_time_ms}
+        return {name: value for name, value in options.items() if value is not None}
+
+    def start(self):
+        """Starts the max_time_ms clock."""
+        if self.max_time_ms:
+            self._deadline = time.monotonic() + self.max_time_ms / 1000
+
+    def time_left(self) -> Optional[float]:
+        """Seconds until the deadline (None without a time limit)."""
+        if self._deadline is None:
+            return None
+        return max(0.0, self._deadline - time.monotonic())
+
+    def expired(self) -> bool:
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
 
 class BaseExtractor(ABC):
-    def __init__(self, file_bytes: bytes, filename: str):
-        self.file_bytes = file_bytes
+    def __init__(self, source: Source, filename: str):
+        # Either raw bytes or a SpooledUpload (temp file + mmap)
+        self.source = source
         self.filename = filename
+        # Optional hook called as progress_callback(done, total)
+        self.progress_callback: Optional[Callable[[int, int], None]] = None
+        # Partial extraction; `truncated` is set when a limit cut the result short
+        self.limits = ExtractionLimits()
+        self.truncated = False
+        # Pages left out on purpose (e.g. blank scans); reported with the result
+        self.skipped_pages: List[int] = []
+        # Units and pages still to come after the last handed-out unit (None: unknown), see has_more()
+        self._left: Optional[int] = None
 
     @abstractmethod
-    def extract(self) -> List[ExtractedUnit]:
+    def iter_units(self) -> Iterator[ExtractedUnit]:
         """
         All extractors must implement this method.
-        Returns a list of standardized ExtractedUnits.
+        Yields standardized ExtractedUnits as soon as they are produced,
+        so callers can stream them without holding the whole document.
+        """
+        pass
+
+    def iter_limited(self) -> Iterator[ExtractedUnit]:
         """
-        pass
\ No newline at end of file
+        iter_units() cut off at max_units / max_time_ms.
+        The limits are checked before asking for the next unit, and the
+        generator is closed right away, so no further page or image is processed.
+        At max_units, has_more() decides whether the result counts as truncated.
+        """
+        self.limits.start()
+        max_units = self.limits.max_units
+        units = self.iter_units()
+        count = 0
+        try:
+            while True:
+                if max_units and count >= max_units:
+                    more = self.has_more()
+                    self.truncated = self.truncated or more
+                    return
+                if self.limits.expired():
+                    self.truncated = True
+                    return
+                unit = next(units, None)
+                if unit is None:
+                    return
+                count += 1
+                yield unit
+        finally:
+            units.close()
+
+    def has_more(self) -> bool:
+        """
+        Asked by iter_limited() once max_units units were handed out, while
+        iter_units() is paused: does the document hold more? The answer comes
+        from what is already known (units of the current page, pages not read
+        yet), never from producing the next unit, which could mean another page
+        of parsing and OCR. Without that knowledge the answer is yes.
+        """
+        return self._left is None or self._left > 0
+
+    def _hand_out(self, units: Iterable[ExtractedUnit], pages_left: int) -> Iterator[ExtractedUnit]:
+        """Yields units that are already produced (a page, a batch of pages) and keeps count for has_more()."""
+        units = list(units)
+        for i, unit in enumerate(units):
+            self._left = len(units) - i - 1 + pages_left
+            yield unit
+
+    def extract(self) -> List[ExtractedUnit]:
+        """Returns every unit as a list (the non-streaming API)."""
+        return list(self.iter_limited())
+
+    def extract_columns(self) -> UnitColumns:
+        """
+        Every unit in compact column storage (the ?format=columnar API).
+        Units are folded in one at a time, so no list of models is kept;
+        extractors with bulk output (tables) override this to skip the models entirely.
+        """
+        columns = UnitColumns()
+        for unit in self.iter_limited():
+            columns.append(unit)
+        return columns
+
+    def open_stream(self):
+        """Binary file object over the upload, for parsers that read streams."""
+        return open_source(self.source)
+
+    def buffer(self):
+        """Zero-copy bytes-like view of the upload."""
+        return as_buffer(self.source)
+
+    def report_progress(self, done: int, total: int):
+        """Lets long-running extractors tell the job API how far along they are."""
+        if self.progress_callback is not None:
+            self.progress_callback(done, total)
@@ -1,94 +1,606 @@
 import io
+import posixpath
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import wait, FIRST_COMPLETED
+from itertools import islice
+import cv2
+import numpy as np
 import pdfplumber
 import docx
-import pytesseract
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import LITERALS_DCT_DECODE, LITERALS_JPX_DECODE, resolve1
+from app import config
 from app.extractors.base import BaseExtractor
+from app.metrics import collect_timings, record_stage, stage
+from app.ocr import DocumentOCRCache, image_key, ocr_image, ocr_images
+from app.pools import ProcessPool
 from app.schemas import ExtractedUnit, Location
-from app.utils import preprocess_image_for_ocr
+from app.uploads import SpooledUpload
+from app.utils import (
+    analyze_scanned_page,
+    choose_ocr_dpi,
+    pil_to_array,
+    preprocess_array_for_ocr,
+    preprocess_arrays_for_ocr,
+    preprocess_image_for_ocr,
+    preprocess_images_for_ocr,
+)
+
+# Colour spaces whose raw 8-bit samples can be reshaped directly into an array
+_RAW_CHANNELS = {"DeviceGray": 1, "DeviceRGB": 3}
+
+
+def _native_image_array(img):
+    """
+    Decodes an embedded image straight from its XObject stream.
+    JPEG/JPEG2000 streams are decoded once by OpenCV; plain 8-bit gray/RGB
+    samples are reshaped in place. Returns (array, channel_order), or None
+    when the encoding isn't understood and the region must be rendered instead.
+    """
+    stream = img.get("stream")
+    if stream is None:
+        return None
+
+    try:
+        filters = stream.get_filters()
+        last_filter = filters[-1][0] if filters else None
+        data = stream.get_data()
+
+        if last_filter in LITERALS_DCT_DECODE or last_filter in LITERALS_JPX_DECODE:
+            pixels = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            return (pixels, "BGR") if pixels is not None else None
+
+        if img.get("bits") != 8 or img.get("imagemask"):
+            return None
+
+        colorspace = [resolve1(cs) for cs in (img.get("colorspace") or [])]
+        if len(colorspace) != 1:
+            return None
+        colorspace = colorspace[0]
+
+        # Indexed images: 1 byte per pixel pointing into a palette of the base colour space
+        palette = None
+        if isinstance(colorspace, list) and len(colorspace) == 4 and getattr(colorspace[0], "name", None) == "Indexed":
+            lookup = resolve1(colorspace[3])
+            lookup = lookup.get_data() if hasattr(lookup, "get_data") else bytes(lookup)
+            colorspace = resolve1(colorspace[1])
+            base_channels = _RAW_CHANNELS.get(getattr(colorspace, "name", None))
+            if base_channels is None:
+                return None
+            palette = np.frombuffer(lookup, np.uint8)
+            palette = palette[:len(palette) // base_channels * base_channels].reshape(-1, base_channels)
+
+        channels = 1 if palette is not None else _RAW_CHANNELS.get(getattr(colorspace, "name", None))
+        if channels is None:
+            return None
+
+        width, height = (int(v) for v in img["srcsize"])
+        expected = width * height * channels
+        if len(data) < expected:
+            return None
+        pixels = np.frombuffer(data, np.uint8, count=expected).reshape(height, width, channels)
+
+        if palette is not None:
+            pixels = palette[np.minimum(pixels[:, :, 0], len(palette) - 1)]
+        return (pixels[:, :, 0] if pixels.shape[2] == 1 else pixels), "RGB"
+    except Exception:
+        return None
+
+
+def _extract_pdf_page(page, i, ocr_cache):
+    """
+    Extracts every unit from a single pdfplumber page (i is 0-based).
+    `ocr_cache` is the document's DocumentOCRCache.
+    """
+    units = []
+    # 1. Try standard text extraction
+    with stage("parse"):
+        text = page.extract_text()
+
+    # Check if page is readable text (Native PDF)
+    is_native_text = text and len(text.strip()) >= 10
+
+    if is_native_text:
+        # A. Add the text found
+        units.append(ExtractedUnit(
+            text=text.strip(),
+            source=f"page_{i+1}",
+            location=Location(type="page", number=i+1)
+        ))
+
+        # B. Look for embedded images "in between" the text
+        # (e.g., charts, photos in a digital PDF)
+        found = []    # (img_idx, content key) for every image worth reading
+        misses = {}   # content key -> (pixels, channel_order), preprocessed + OCR'd once per page batch
+        for img_idx, img in enumerate(page.images):
+            try:
+                # Filter out tiny artifacts (lines/icons < 50px)
+                x0, top, x1, bottom = img['x0'], img['top'], img['x1'], img['bottom']
+                if (x1 - x0) < 50 or (bottom - top) < 50:
+                    continue
+
+                # Prefer the image's own pixels from its PDF stream
+                with stage("parse"):
+                    native = _native_image_array(img)
+                if native is not None:
+                    pixels, channel_order = native
+                else:
+                    # Otherwise crop + render at high-res, straight to an array (no PNG round trip)
+                    with stage("rasterize"):
+                        cropped = page.crop((x0, top, x1, bottom))
+                        pixels, channel_order = pil_to_array(cropped.to_image(resolution=300).original), "RGB"
+
+                # Repeated logos/letterheads are only preprocessed and OCR'd once
+                key = image_key(pixels)
+                found.append((img_idx, key))
+                if key not in misses and ocr_cache.get(key) is None:
+                    misses[key] = (pixels, channel_order)
+            except Exception as e:
+                # If an image fails, skip it and continue
+                print(f"PDF Image Extract Error page {i+1}: {e}")
+
+        # Every new image of the page is preprocessed and OCR'd in one batch
+        if misses:
+            try:
+                processed = dict(zip(misses, preprocess_arrays_for_ocr(list(misses.values()))))
+                misses = None  # the raw pixels aren't needed during OCR
+                readable = [key for key, image in processed.items() if image is not None]
+                texts = ocr_images([processed[key] for key in readable])
+                for key, img_text in zip(readable, texts):
+                    ocr_cache.put(key, img_text)
+            except Exception as e:
+                print(f"PDF Image Extract Error page {i+1}: {e}")
+
+        for img_idx, key in found:
+            img_text = (ocr_cache.get(key) or "").strip()
+            if img_text:
+                units.append(ExtractedUnit(
+                    text=f"[Image Extraction]: {img_text}",
+                    source=f"page_{i+1}_img_{img_idx+1}",
+                    location=Location(type="pixel_box", number=i+1)
+                ))
+
+    else:
+        # FALLBACK: Page is empty or looks like a scan
+        units.extend(_ocr_scanned_page(page, i, ocr_cache))
+
+    return units
+
+
+def _ocr_scanned_page(page, i, ocr_cache):
+    """
+    Adaptive full-page OCR. A cheap low-DPI pre-pass skips blank pages and
+    measures the text size, so the page is rendered at the lowest DPI that
+    keeps glyphs readable instead of a fixed 300.
+    The decision is reported in the unit metadata. A blank page comes back as
+    an empty marker unit, which PDFExtractor drops (see _drop_blank).
+    """
+    with stage("rasterize"):
+        prepass = np.asarray(page.to_image(resolution=config.OCR_PREPASS_DPI).original.convert("L"))
+    analysis = analyze_scanned_page(prepass, config.OCR_PREPASS_DPI, config.OCR_BLANK_INK_PPM / 1_000_000)
+
+    if analysis["blank"]:
+        # Nothing printed: record the skip instead of paying for a 300 DPI render + OCR
+        return [ExtractedUnit(
+            text="",
+            source=f"page_{i+1}_blank",
+            location=Location(type="page", number=i+1),
+            metadata={"skipped": "blank", "ink_ratio": round(analysis["ink_ratio"], 6)}
+        )]
+
+    dpi = choose_ocr_dpi(analysis["text_height_pt"], config.OCR_TARGET_GLYPH_PX, config.OCR_MIN_DPI, config.OCR_MAX_DPI)
+    with stage("rasterize"):
+        pixels = pil_to_array(page.to_image(resolution=dpi).original)
+    key = image_key(pixels)
+    text = ocr_cache.get(key)
+    if text is None:
+        processed_im = preprocess_array_for_ocr(pixels, "RGB", dpi=dpi)
+        text = ocr_image(processed_im)
+        ocr_cache.put(key, text)
+
+    if not (text and text.strip()):
+        return []
+
+    text_height = analysis["text_height_pt"]
+    return [ExtractedUnit(
+        text=text.strip(),
+        source=f"page_{i+1}_full_ocr",
+        location=Location(type="page", number=i+1),
+        metadata={"ocr_dpi": dpi, "text_height_pt": round(text_height, 1) if text_height else None}
+    )]
+
+
+def _extract_pdf_page_range(source_ref, page_indexes):
+    """
+    Worker entry point: opens the PDF and extracts the given (0-based) pages.
+    `source_ref` is a spool file path or raw bytes.
+    Lives at module level so the process pool can pickle it.
+    Returns (units, stage timings) so the parent can account for the worker's time.
+    """
+    units = []
+    # Each worker task gets its own document scope in front of the worker's shared cache
+    ocr_cache = DocumentOCRCache()
+    with collect_timings() as timings:
+        with stage("parse"):
+            pdf = pdfplumber.open(source_ref if isinstance(source_ref, str) else io.BytesIO(source_ref))
+        with pdf:
+            for i in page_indexes:
+                units.extend(_extract_pdf_page(pdf.pages[i], i, ocr_cache))
+    return units, timings
+
+
+# Process pool shared by all PDF extractions
+_page_pool = ProcessPool()
+
 
 class PDFExtractor(BaseExtractor):
-    def extract(self):
-        units = []
-        with pdfplumber.open(io.BytesIO(self.file_bytes)) as pdf:
-            for i, page in enumerate(pdf.pages):
-                # 1. Try standard text extraction
-                text = page.extract_text()
-                
-                # Check if page is readable text (Native PDF)
-                is_native_text = text and len(text.strip()) >= 10
-
-                if is_native_text:
-                    # A. Add the text found
-                    units.append(ExtractedUnit(
-                        text=text.strip(),
-                        source=f"page_{i+1}",
-                        location=Location(type="page", number=i+1)
-                    ))
-
-                    # B. Look for embedded images "in between" the text
-                    # (e.g., charts, photos in a digital PDF)
-                    for img_idx, img in enumerate(page.images):
-                        try:
-                            # Filter out tiny artifacts (lines/icons < 50px)
-                            x0, top, x1, bottom = img['x0'], img['top'], img['x1'], img['bottom']
-                            if (x1 - x0) < 50 or (bottom - top) < 50:
-                                continue
-
-                            # Crop and OCR
-                            cropped = page.crop((x0, top, x1, bottom))
-                            # Convert to high-res image for OCR
-                            im_obj = cropped.to_image(resolution=300).original
-                            
-                            # Convert to bytes for our preprocessor
-                            buf = io.BytesIO()
-                            im_obj.save(buf, format='PNG')
-                            
-                            processed_im = preprocess_image_for_ocr(buf.getvalue())
-                            img_text = pytesseract.image_to_string(processed_im).strip()
-
-                            if img_text:
-                                units.append(ExtractedUnit(
-                                    text=f"[Image Extraction]: {img_text}",
-                                    source=f"page_{i+1}_img_{img_idx+1}",
-                                    location=Location(type="pixel_box", number=i+1)
+    def __init__(self, source, filename, workers=None, max_workers_per_doc=None, pages_per_task=None):
+        super().__init__(source, filename)
+        self.workers = config.PDF_POOL_WORKERS if workers is None else workers
+        self.max_workers_per_doc = max(1, max_workers_per_doc or config.PDF_MAX_WORKERS_PER_DOC)
+        self.pages_per_task = max(1, pages_per_task or config.PDF_PAGES_PER_TASK)
+
+    def _runs_inline(self, page_count: int) -> bool:
+        # Small selections (or a disabled pool) are processed inline
+        return self.workers <= 1 or page_count < config.PDF_PARALLEL_MIN_PAGES
+
+    def fans_out(self) -> bool:
+        """
+        Whether iter_units() would hand page ranges to the page pool. Only the
+        page tree's /Count is read, not the pages, so this is cheap to ask up front.
+        """
+        if self.workers <= 1:
+            return False
+        try:
+            with self.open_stream() as stream:
+                catalog = PDFDocument(PDFParser(stream)).catalog
+                page_count = int(resolve1(resolve1(catalog["Pages"])["Count"]))
+        except Exception:
+            # Left to the real parse, which reports the damage itself
+            return False
+        wanted = (number for number in range(1, page_count + 1) if self.limits.wants_page(number))
+        # Counting stops at the threshold; past it the answer can't change
+        selected = sum(1 for _ in islice(wanted, config.PDF_PARALLEL_MIN_PAGES))
+        return not self._runs_inline(selected)
+
+    def iter_units(self):
+        with self.open_stream() as stream:
+            with stage("parse"):
+                pdf = pdfplumber.open(stream)
+            with pdf:
+                # ?pages= narrows the work up front; page numbers in the units stay absolute
+                page_indexes = [i for i in range(len(pdf.pages)) if self.limits.wants_page(i + 1)]
+                if self._runs_inline(len(page_indexes)):
+                    ocr_cache = DocumentOCRCache()
+                    for done, i in enumerate(page_indexes):
+                        if self.limits.expired():
+                            self.truncated = True
+                            return
+                        units = self._drop_blank(_extract_pdf_page(pdf.pages[i], i, ocr_cache))
+                        yield from self._hand_out(units, pages_left=len(page_indexes) - done - 1)
+                        self.report_progress(done + 1, len(page_indexes))
+                    return
+
+        yield from self._iter_parallel(page_indexes)
+
+    def _drop_blank(self, units):
+        """Drops the blank-page markers, so every unit carries text; their pages go to skipped_pages."""
+        kept = []
+        for unit in units:
+            if unit.metadata and unit.metadata.get("skipped") == "blank":
+                self.skipped_pages.append(unit.location.number)
+            else:
+                kept.append(unit)
+        return kept
+
+    def _iter_parallel(self, page_indexes):
+        """
+        Fans page ranges out to the shared process pool, keeping at most
+        `max_workers_per_doc` ranges of this document in flight.
+        Units are yielded in page order as soon as the next range is ready.
+        """
+        pool = _page_pool.get(config.PDF_POOL_WORKERS)
+        # Workers re-open the spool file by path instead of receiving a pickled copy
+        source_ref = self.source.path if isinstance(self.source, SpooledUpload) else self.source
+        page_count = len(page_indexes)
+        ranges = [page_indexes[start:start + self.pages_per_task]
+                  for start in range(0, page_count, self.pages_per_task)]
+        results = {}
+        pending = {}
+        next_range = 0
+        next_to_yield = 0
+        pages_done = 0
+
+        try:
+            while next_to_yield < len(ranges):
+                # Top up this document's in-flight tasks to its cap
+                while next_range < len(ranges) and len(pending) < self.max_workers_per_doc:
+                    future = pool.submit(_extract_pdf_page_range, source_ref, ranges[next_range])
+                    pending[future] = next_range
+                    next_range += 1
+
+                done, _ = wait(pending, timeout=self.limits.time_left(), return_when=FIRST_COMPLETED)
+                if not done:
+                    # max_time_ms ran out while pages were still being worked on
+                    self.truncated = True
+                    return
+                for future in done:
+                    range_idx = pending.pop(future)
+                    results[range_idx], worker_timings = future.result()
+                    for name, seconds in worker_timings.items():
+                        record_stage(name, seconds)
+                    pages_done += len(ranges[range_idx])
+                    self.report_progress(pages_done, page_count)
+
+                # Release every range that is now contiguous with what we already sent
+                while next_to_yield in results:
+                    units = self._drop_blank(results.pop(next_to_yield))
+                    pages_left = page_count - min(page_count, (next_to_yield + 1) * self.pages_per_task)
+                    yield from self._hand_out(units, pages_left)
+                    next_to_yield += 1
+        finally:
+            # On errors (or an abandoned stream) don't leave this document queued in the pool
+            for future in pending:
+                future.cancel()
+
+
+# --- DOCX fast path: word/document.xml read straight from the zip ---
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_R_EMBED = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed"
+_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+
+# Run children that stand for text, rendered like python-docx's Run.text
+_RUN_TEXT = {_W + "tab": "\t", _W + "ptab": "\t", _W + "cr": "\n", _W + "noBreakHyphen": "-"}
+
+
+def _docx_rels(archive, part):
+    """Relationship id -> zip path for one part (external targets are left out)."""
+    base, name = posixpath.split(part)
+    try:
+        rels = ET.fromstring(archive.read(posixpath.join(base, "_rels", name + ".rels")))
+    except KeyError:
+        return {}
+    targets = {}
+    for rel in rels.iter(_PKG_REL):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target", "")
+        path = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(base, target))
+        targets[rel.get("Id")] = path
+    return targets
+
+
+def _docx_main_part(archive):
+    """Zip path of the main document part (almost always word/document.xml)."""
+    try:
+        package_rels = ET.fromstring(archive.read("_rels/.rels"))
+    except KeyError:
+        return "word/document.xml"
+    for rel in package_rels.iter(_PKG_REL):
+        if rel.get("Type", "").endswith("/officeDocument"):
+            return rel.get("Target", "").lstrip("/")
+    return "word/document.xml"
+
+
+def _run_text(run):
+    parts = []
+    for child in run:
+        if child.tag == _W + "t":
+            parts.append(child.text or "")
+        elif child.tag == _W + "br":
+            # Page and column breaks carry no text
+            parts.append("\n" if child.get(_W + "type", "textWrapping") == "textWrapping" else "")
+        else:
+            parts.append(_RUN_TEXT.get(child.tag, ""))
+    return "".join(parts)
+
+
+def _paragraph_text(p):
+    """Text of the paragraph's own runs (and hyperlinks), not of nested text boxes."""
+    parts = []
+    for child in p:
+        if child.tag == _W + "r":
+            parts.append(_run_text(child))
+        elif child.tag == _W + "hyperlink":
+            parts.extend(_run_text(run) for run in child if run.tag == _W + "r")
+    return "".join(parts)
+
+
+def _table_rows(tbl):
+    """
+    Row texts of a table, built like python-docx's row.cells:
+    a horizontal span repeats its cell, a vertical merge repeats the cell above.
+    """
+    rows = []
+    above = {}
+    for tr in tbl.iterfind(_W + "tr"):
+        grid_before = tr.find(f"{_W}trPr/{_W}gridBefore")
+        offset = int(grid_before.get(_W + "val", 0)) if grid_before is not None else 0
+        cells = []
+        current = {}
+        for tc in tr.iterfind(_W + "tc"):
+            span = tc.find(f"{_W}tcPr/{_W}gridSpan")
+            span = int(span.get(_W + "val", 1)) if span is not None else 1
+            merge = tc.find(f"{_W}tcPr/{_W}vMerge")
+            if merge is not None and merge.get(_W + "val", "continue") == "continue":
+                text = above.get(offset, "")
+            else:
+                text = "\n".join(_paragraph_text(p) for p in tc.iterfind(_W + "p"))
+            for _ in range(span):
+                current[offset] = text
+                cells.append(text)
+                offset += 1
+        above = current
+        rows.append(" | ".join(cell.strip() for cell in cells if cell.strip()))
+    return rows
+
+
+def _iter_docx_blocks(xml_stream):
+    """
+    One iterparse pass over document.xml, yielding the body's blocks in order:
+        ("paragraph", text, [image relationship ids])
+        ("table", [row texts])
+    Each block is cleared once handled, so memory stays flat on long documents.
+    Time spent here (not in the consumer) is recorded as the "parse" stage.
+    """
+    parse_seconds = 0.0
+    resumed = time.perf_counter()
+    depth = 0
+    body_depth = None
+    for event, elem in ET.iterparse(xml_stream, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if elem.tag == _W + "body":
+                body_depth = depth
+            continue
+
+        if body_depth is not None and depth == body_depth + 1:
+            block = None
+            if elem.tag == _W + "p":
+                # Images hang off the paragraph's own runs, like Paragraph.runs
+                rel_ids = [node.get(_R_EMBED) for run in elem.iterfind(_W + "r")
+                           for node in run.iter() if node.tag.endswith("}blip") and node.get(_R_EMBED)]
+                block = ("paragraph", _paragraph_text(elem), rel_ids)
+            elif elem.tag == _W + "tbl":
+                block = ("table", _table_rows(elem))
+            elem.clear()
+            if block is not None:
+                parse_seconds += time.perf_counter() - resumed
+                yield block
+                resumed = time.perf_counter()
+        depth -= 1
+
+    record_stage("parse", parse_seconds + time.perf_counter() - resumed)
+
+
+class WordExtractor(BaseExtractor):
+    def __init__(self, source, filename, engine=None):
+        super().__init__(source, filename)
+        # "streaming" walks the XML once; "python-docx" builds the full object model
+        self.engine = engine or config.DOCX_ENGINE
+
+    def iter_units(self):
+        if self.engine == "python-docx":
+            yield from self._iter_python_docx()
+        else:
+            yield from self._iter_streaming()
+
+    def _iter_streaming(self):
+        """
+        Paragraph units are emitted while document.xml is being read.
+        Table rows keep their place after the paragraphs, and the images
+        referenced along the way are OCR'd in one batch once the pass is done.
+        """
+        with self.open_stream() as stream, zipfile.ZipFile(stream) as archive:
+            main_part = _docx_main_part(archive)
+            images = []
+            table_units = []
+            paragraph_number = 0
+            table_number = 0
+
+            with archive.open(main_part) as xml_stream:
+                for block in _iter_docx_blocks(xml_stream):
+                    if self.limits.expired():
+                        self.truncated = True
+                        return
+                    if block[0] == "paragraph":
+                        _, text, rel_ids = block
+                        paragraph_number += 1
+                        if text.strip():
+                            yield ExtractedUnit(
+                                text=text.strip(),
+                                source="paragraph",
+                                location=Location(type="row", number=paragraph_number)
+                            )
+                        images.extend((paragraph_number, rel_id) for rel_id in rel_ids)
+                    else:
+                        table_number += 1
+                        for r_idx, row_text in enumerate(block[1]):
+                            if row_text:
+                                table_units.append(ExtractedUnit(
+                                    text=row_text,
+                                    source=f"table_{table_number}",
+                                    location=Location(type="row", number=r_idx + 1)
                                 ))
-                        except Exception as e:
-                            # If an image fails, skip it and continue
-                            print(f"PDF Image Extract Error page {i+1}: {e}")
 
+            if images and self.limits.expired():
+                self.truncated = True
+                return
+            if images:
+                yield from self._ocr_media(archive, _docx_rels(archive, main_part), images)
+        yield from table_units
+
+    def _ocr_media(self, archive, rels, images):
+        """
+        OCRs every distinct image once and yields a unit per reference.
+        Images are read, preprocessed and OCR'd in batches of OCR_WORKERS,
+        so only one batch of media blobs is in memory at a time.
+        """
+        ocr_cache = DocumentOCRCache()
+        texts = {}
+        pending = {}   # path -> (content key, image bytes), flushed every OCR_WORKERS images
+        window = max(1, config.OCR_WORKERS)
+
+        def flush():
+            try:
+                processed = preprocess_images_for_ocr([image_bytes for _, image_bytes in pending.values()])
+                readable = [(path, image) for path, image in zip(pending, processed) if image is not None]
+                for (path, _), text in zip(readable, ocr_images([image for _, image in readable])):
+                    ocr_cache.put(pending[path][0], text)
+                    texts[path] = text
+            except Exception as e:
+                # Skip the batch's images, keep the document
+                print(f"Word Image Extract Error: {e}")
+            pending.clear()
+
+        seen = set()
+        for _, rel_id in images:
+            path = rels.get(rel_id)
+            if path is None or path in seen:
+                continue
+            seen.add(path)
+            try:
+                image_bytes = archive.read(path)
+                key = image_key(image_bytes)
+                text = ocr_cache.get(key)
+                if text is None:
+                    pending[path] = (key, image_bytes)
                 else:
-                    # FALLBACK: Page is empty or looks like a scan
-                    # Render entire page as image for OCR
-                    im = page.to_image(resolution=300).original
-                    buf = io.BytesIO()
-                    im.save(buf, format='PNG')
-                    processed_im = preprocess_image_for_ocr(buf.getvalue())
-                    text = pytesseract.image_to_string(processed_im)
-                    
-                    if text and text.strip():
-                        units.append(ExtractedUnit(
-                            text=text.strip(),
-                            source=f"page_{i+1}_full_ocr",
-                            location=Location(type="page", number=i+1)
-                        ))
-
-        return units
+                    texts[path] = text
+            except Exception as e:
+                print(f"Word Image Extract Error: {e}")
+            if len(pending) >= window:
+                flush()
+        if pending:
+            flush()
 
+        for paragraph_number, rel_id in images:
+            img_text = texts.get(rels.get(rel_id), "").strip()
+            if img_text:
+                yield ExtractedUnit(
+                    text=f"[Image Extraction]: {img_text}",
+                    source=f"inline_image_para_{paragraph_number}",
+                    location=Location(type="row", number=paragraph_number)
+                )
 
-class WordExtractor(BaseExtractor):
-    def extract(self):
-        doc = docx.Document(io.BytesIO(self.file_bytes))
-        units = []
+    def _iter_python_docx(self):
+        with self.open_stream() as stream, stage("parse"):
+            doc = docx.Document(stream)
+        ocr_cache = DocumentOCRCache()
         
         # 1. Extract Paragraphs & Inline Images
         for i, para in enumerate(doc.paragraphs):
             # A. Standard Text
             if para.text.strip():
-                units.append(ExtractedUnit(
+                yield ExtractedUnit(
                     text=para.text.strip(),
                     source="paragraph",
                     location=Location(type="row", number=i+1)
-                ))
+                )
             
             # B. Check for Embedded Images in this paragraph
             # We iterate through 'runs' to find XML drawing elements
@@ -106,16 +618,21 @@ class WordExtractor(BaseExtractor):
                                     image_part = doc.part.rels[embed_attr].target_part
                                     image_bytes = image_part.blob
                                     
-                                    # Run OCR
-                                    processed = preprocess_image_for_ocr(image_bytes)
-                                    img_text = pytesseract.image_to_string(processed).strip()
+                                    # Run OCR (identical media is only recognized once)
+                                    key = image_key(image_bytes)
+                                    img_text = ocr_cache.get(key)
+                                    if img_text is None:
+                                        processed = preprocess_image_for_ocr(image_bytes)
+                                        img_text = ocr_image(processed)
+                                        ocr_cache.put(key, img_text)
+                                    img_text = img_text.strip()
                                     
                                     if img_text:
-                                        units.append(ExtractedUnit(
+                                        yield ExtractedUnit(
                                             text=f"[Image Extraction]: {img_text}",
                                             source=f"inline_image_para_{i+1}",
                                             location=Location(type="row", number=i+1)
-                                        ))
+                                        )
                     except Exception as e:
                         print(f"Word Image Extract Error: {e}")
 
@@ -125,10 +642,8 @@ class WordExtractor(BaseExtractor):
                 row_text = " | ".join([cell.text.strip() for cell in row.cells if cell.text.strip()])
                 
                 if row_text:
-                    units.append(ExtractedUnit(
+                    yield ExtractedUnit(
                         text=row_text,
                         source=f"table_{t_idx+1}",
                         location=Location(type="row", number=r_idx+1)
-                    ))
-                    
-        return units
\ No newline at end of file
+                    )
@@ -1,21 +1,156 @@
-import pytesseract
+from typing import Iterator, List, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app import config
 from app.extractors.base import BaseExtractor
+from app.metrics import stage
+from app.ocr import ocr_images
 from app.schemas import ExtractedUnit, Location
-from app.utils import preprocess_image_for_ocr
+from app.utils import pipeline
+
+
+def _bands(height: int, width: int, max_pixels: int, overlap: int) -> Iterator[Tuple[int, int]]:
+    """
+    (top, bottom) rows of full-width bands holding about max_pixels each.
+    Neighbours share `overlap` rows, so every text line is whole in at least one band.
+    """
+    band = max(overlap * 4, max_pixels // max(width, 1))
+    top = 0
+    while True:
+        bottom = min(height, top + band)
+        yield top, bottom
+        if bottom == height:
+            return
+        top = bottom - overlap
+
+
+def _merge_bands(texts: List[str]) -> str:
+    """Joins the text of consecutive bands, dropping lines read twice in the overlap."""
+    lines: List[str] = []
+    for text in texts:
+        band_lines = text.strip().splitlines()
+        head = [line.strip() for line in band_lines if line.strip()][:3]
+        tail = [line.strip() for line in lines if line.strip()][-3:]
+        # Longest run of the band's first lines that repeats the end of the text so far
+        repeated = next((n for n in range(min(len(head), len(tail)), 0, -1) if head[:n] == tail[-n:]), 0)
+        while repeated:
+            if band_lines.pop(0).strip():
+                repeated -= 1
+        lines.extend(band_lines)
+    return "\n".join(lines)
+
+
+def _frame_gray(frame: Image.Image) -> Tuple[np.ndarray, float]:
+    """
+    Current frame of a (multi-page) image as grayscale pixels plus its DPI.
+    Fax pages are often 204x98 DPI; those are stretched back to square pixels.
+    """
+    pixels = np.asarray(frame.convert("L"))
+    dpi = frame.info.get("dpi")
+    if not dpi or min(dpi) <= 0:
+        return pixels, None
+    x_dpi, y_dpi = float(dpi[0]), float(dpi[1])
+    if abs(x_dpi - y_dpi) > 1:
+        height, width = pixels.shape
+        size = (round(width * max(x_dpi, y_dpi) / x_dpi), round(height * max(x_dpi, y_dpi) / y_dpi))
+        pixels = cv2.resize(pixels, size, interpolation=cv2.INTER_LINEAR)
+    return pixels, max(x_dpi, y_dpi)
+
 
 class ImageExtractor(BaseExtractor):
-    def extract(self):
-        # 1. Preprocess using OpenCV (defined in utils.py)
-        processed_image = preprocess_image_for_ocr(self.file_bytes)
-        
-        # 2. Run Tesseract
-        text = pytesseract.image_to_string(processed_image)
-        
-        if not text.strip():
+    """
+    OCRs PNG/JPEG/TIFF uploads. Multi-page TIFFs (faxes) are decoded one frame
+    at a time and every page becomes its own unit; images too big for one
+    Tesseract pass are read in overlapping bands, so memory stays bounded.
+    """
+
+    def iter_units(self):
+        with self.open_stream() as stream:
+            try:
+                im = Image.open(stream)
+            except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+                # Not something PIL reads (or over its pixel limit): OpenCV has a go below
+                im = None
+            if im is not None:
+                with im:
+                    # Only TIFFs hold pages; extra frames elsewhere are previews (e.g. MPO camera JPEGs)
+                    frame_count = getattr(im, "n_frames", 1)
+                    if im.format == "TIFF" and frame_count > 1:
+                        yield from self._iter_frames(im, frame_count)
+                        return
+
+        # 1. Preprocess using OpenCV (defined in utils.py), decoded straight to one channel
+        with stage("preprocess"):
+            gray = pipeline.decode(self.buffer(), direct_gray=True)
+
+        # 2. Run Tesseract (through the shared OCR engine), band by band if needed
+        text = self._read(gray)
+
+        if text.strip():
+            # A single image has one unit at most
+            self._left = 0
+            yield ExtractedUnit(
+                text=text.strip(),
+                source="ocr_engine",
+                location=Location(type="pixel_box", number=1)
+            )
+
+    def _iter_frames(self, im: Image.Image, frame_count: int):
+        """One unit per page; pages are OCR'd in batches of OCR_WORKERS, in parallel."""
+        pending = []   # (page number, grayscale pixels)
+        for index in range(frame_count):
+            number = index + 1
+            if not self.limits.wants_page(number):
+                continue
+            if self.limits.expired():
+                self.truncated = True
+                break
+            with stage("preprocess"):
+                im.seek(index)
+                pixels, dpi = _frame_gray(im)
+                # Already one channel: this only applies the downscale step
+                pending.append((number, pipeline.to_gray(pixels, dpi=dpi)))
+            if len(pending) >= max(1, config.OCR_WORKERS):
+                pages_left = sum(1 for later in range(number + 1, frame_count + 1) if self.limits.wants_page(later))
+                yield from self._hand_out(self._read_pages(pending), pages_left)
+                pending = []
+            self.report_progress(number, frame_count)
+        yield from self._hand_out(self._read_pages(pending), pages_left=0)
+
+    def _read_pages(self, pages):
+        if not pages:
             return []
+        texts = self._read_many([gray for _, gray in pages])
+        return [ExtractedUnit(text=text.strip(), source=f"page_{number}", location=Location(type="page", number=number))
+                for (number, _), text in zip(pages, texts) if text.strip()]
+
+    def _read(self, gray: np.ndarray) -> str:
+        return self._read_many([gray])[0]
+
+    def _read_many(self, grays: List[np.ndarray]) -> List[str]:
+        """
+        OCRs several grayscale images in one engine batch. Each one is cut into
+        bands when it is over OCR_TILE_PIXELS; the bands are thresholded as they
+        are sent, at most OCR_WORKERS at a time, so only that many binarized copies exist.
+        """
+        jobs = []   # (image index, band pixels)
+        for position, gray in enumerate(grays):
+            height, width = gray.shape
+            if height * width <= config.OCR_TILE_PIXELS:
+                jobs.append((position, gray))
+            else:
+                for top, bottom in _bands(height, width, config.OCR_TILE_PIXELS, config.OCR_TILE_OVERLAP_PX):
+                    jobs.append((position, gray[top:bottom]))
 
-        return [ExtractedUnit(
-            text=text.strip(),
-            source="ocr_engine",
-            location=Location(type="pixel_box", number=1)
-        )]
\ No newline at end of file
+        band_texts: List[List[str]] = [[] for _ in grays]
+        window = max(1, config.OCR_WORKERS)
+        for start in range(0, len(jobs), window):
+            batch = jobs[start:start + window]
+            with stage("preprocess"):
+                images = [pipeline.finish(band) for _, band in batch]
+            for (position, _), text in zip(batch, ocr_images(images)):
+                band_texts[position].append(text)
+        return [_merge_bands(texts) for texts in band_texts]
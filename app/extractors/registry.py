@@ -0,0 +1,93 @@
+import importlib
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class ExtractorSpec:
+    """Where an extractor lives; the module is only imported on first use."""
+
+    def __init__(self, mime_type: str, target: str, file_type: str, options: dict):
+        self.mime_type = mime_type
+        self.module_name, self.class_name = target.split(":")
+        self.file_type = file_type
+        self.options = options
+
+    def load(self):
+        """Imports the module (cached by Python after the first call) and returns the class."""
+        return getattr(importlib.import_module(self.module_name), self.class_name)
+
+    def __call__(self, source, filename):
+        return self.load()(source, filename, **self.options)
+
+
+class ExtractorRegistry:
+    """
+    MIME type -> extractor. pdfplumber, pandas, OpenCV, ... are imported when
+    a format is first extracted (or warmed up), not when the app starts.
+    """
+
+    def __init__(self):
+        self._specs: Dict[str, ExtractorSpec] = {}
+        self._extensions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def register(self, mime_type: str, target: str, file_type: str, extensions: Iterable[str] = (), **options):
+        """
+        `target` is "module:Class"; `options` are passed to the constructor.
+        `extensions` map file names to this type when libmagic can't tell.
+        """
+        self._specs[mime_type] = ExtractorSpec(mime_type, target, file_type, options)
+        for extension in extensions:
+            self._extensions[extension] = mime_type
+
+    def get(self, mime_type: str) -> Optional[ExtractorSpec]:
+        return self._specs.get(mime_type)
+
+    def for_filename(self, filename: str) -> Optional[Tuple[ExtractorSpec, str]]:
+        """Extension fallback: (extractor, mime_type) or None."""
+        lower_name = (filename or "").lower()
+        for extension, mime_type in self._extensions.items():
+            if lower_name.endswith(extension):
+                return self._specs[mime_type], mime_type
+        return None
+
+    def file_type(self, mime_type: str) -> str:
+        spec = self._specs.get(mime_type)
+        return spec.file_type if spec else mime_type
+
+    def warm_up(self, file_types: Iterable[str]) -> Dict[str, float]:
+        """
+        Imports the extractors of the given file types ("pdf", "docx", ... or "all")
+        ahead of the first request. Returns the seconds each module took.
+        """
+        wanted = set(file_types)
+        timings = {}
+        with self._lock:
+            for spec in self._specs.values():
+                if "all" not in wanted and spec.file_type not in wanted:
+                    continue
+                if spec.module_name in timings:
+                    continue
+                start = time.perf_counter()
+                spec.load()
+                timings[spec.module_name] = time.perf_counter() - start
+        return timings
+
+
+registry = ExtractorRegistry()
+
+_WORD = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+registry.register("application/pdf", "app.extractors.documents:PDFExtractor", "pdf", extensions=(".pdf",))
+registry.register(_WORD, "app.extractors.documents:WordExtractor", "docx", extensions=(".docx",))
+registry.register(_XLSX, "app.extractors.tables:TableExtractor", "xlsx", extensions=(".xlsx",))
+registry.register("application/vnd.ms-excel", "app.extractors.tables:TableExtractor", "application/vnd.ms-excel")
+registry.register("text/csv", "app.extractors.tables:TableExtractor", "csv", extensions=(".csv",), is_csv=True)
+registry.register("text/plain", "app.extractors.tables:TableExtractor", "txt", extensions=(".txt",), is_csv=True)
+# Images whose header libmagic can't read are treated as PNG, whatever their extension
+registry.register("image/png", "app.extractors.images:ImageExtractor", "png", extensions=(".png", ".jpg", ".jpeg"))
+registry.register("image/jpeg", "app.extractors.images:ImageExtractor", "jpg")
+registry.register("image/tiff", "app.extractors.images:ImageExtractor", "image/tiff", extensions=(".tif", ".tiff"))
+registry.register("text/html", "app.extractors.web:HTMLExtractor", "html")
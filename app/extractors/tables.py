@@ -1,43 +1,187 @@
-import io
+import openpyxl
 import pandas as pd
+from app import config
 from app.extractors.base import BaseExtractor
-from app.schemas import ExtractedUnit, Location
+from app.metrics import stage
+from app.schemas import ExtractedUnit, Location, UnitColumns
+
+
+def rows_to_text(df: pd.DataFrame) -> pd.Series:
+    """
+    Vectorized "row -> 'a | b | c'" conversion.
+    Works column by column instead of calling str() per cell through iterrows(),
+    but renders cells exactly like the row-wise version did: empty cells are
+    dropped and every value goes through the dtype iterrows() would have given it.
+    Rows without any non-empty cell come back as "".
+    """
+    # Replace NaNs with empty string
+    df = df.fillna("")
+
+    # iterrows() hands out each row with the frame's interleaved dtype
+    # (e.g. ints next to floats become floats), so cast columns the same way
+    row_dtype = df.iloc[:0].to_numpy().dtype
+
+    joined = pd.Series("", index=df.index, dtype=object)
+    for col in df.columns:
+        cells = df[col].astype(row_dtype)
+        # fillna() leaves NaT in datetime columns; str() made it "NaT", astype(str) would make it NaN
+        cells = cells.where(cells.notna(), "NaT").astype(str).astype(object)
+        keep = cells.str.strip() != ""
+        # Only put a separator between two non-empty pieces
+        sep = keep & (joined != "")
+        joined = joined + sep.map({True: " | ", False: ""}) + cells.where(keep, "")
+    return joined
 
 
 class TableExtractor(BaseExtractor):
-    def __init__(self, file_bytes, filename, is_csv=False):
-        super().__init__(file_bytes, filename)
+    def __init__(self, source, filename, is_csv=False, chunk_rows=None, engine=None, sheets=None, max_rows=None):
+        super().__init__(source, filename)
         self.is_csv = is_csv
+        # CSVs are parsed in blocks of this many rows so memory stays flat
+        self.chunk_rows = chunk_rows or config.CSV_CHUNK_ROWS
+        # "pandas" loads whole sheets, "streaming" walks XLSX rows with a read-only openpyxl reader
+        self.engine = engine or config.XLSX_ENGINE
+        # Optional allow-list of sheet names and per-sheet row limit
+        self.sheets = set(sheets) if sheets else None
+        self.max_rows = max_rows
+        # The blocks iter_units() is walking, so has_more() can look at the ones after the current block
+        self._frames = None
+
+    def _streams_xlsx(self):
+        # Only zip-based .xlsx can be streamed; legacy .xls goes through pandas
+        return not self.is_csv and self.engine == "streaming" and self.buffer()[:2] == b"PK"
+
+    def _wants_sheet(self, name):
+        # Constructor allow-list, then the request's ?sheets=
+        return (not self.sheets or name in self.sheets) and self.limits.wants_sheet(name)
+
+    def _iter_frames(self):
+        """(DataFrame, sheet name) blocks: CSV chunks or whole sheets; stops once max_time_ms is up."""
+        for frame in (self._iter_csv() if self.is_csv else self._iter_excel()):
+            if self.limits.expired():
+                self.truncated = True
+                return
+            yield frame
+
+    def iter_units(self):
+        if self._streams_xlsx():
+            yield from self._iter_xlsx_streaming()
+            return
+        self._frames = self._iter_frames()
+        for df, sheet_name in self._frames:
+            yield from self._frame_to_units(df, sheet_name)
+
+    def has_more(self):
+        if self._left or self._frames is None:
+            return super().has_more()
+        # The current block is used up: read on (parsing only) until a block has a non-empty row
+        for df, _ in self._frames:
+            with stage("parse"):
+                if (rows_to_text(df) != "").any():
+                    return True
+        return False
+
+    def extract_columns(self):
+        """Builds the columns straight from each block's vectorized row texts, without unit models."""
+        if self._streams_xlsx():
+            return super().extract_columns()
+        self.limits.start()
+        max_units = self.limits.max_units
+        columns = UnitColumns()
+        for df, sheet_name in self._iter_frames():
+            with stage("parse"):
+                texts = rows_to_text(df)
+                keep = (texts != "").to_numpy()
+            texts, numbers = texts[keep].tolist(), (df.index[keep] + 1).tolist()
+            room = max_units - len(columns) if max_units else len(texts)
+            # Filling max_units exactly isn't truncation; a further non-empty row (maybe in a later block) is
+            if len(texts) > room:
+                columns.extend_rows(texts[:room], numbers[:room], sheet_name)
+                self.truncated = True
+                break
+            columns.extend_rows(texts, numbers, sheet_name)
+        return columns
+
+    def _iter_excel(self):
+        with self.open_stream() as file_io:
+            try:
+                with stage("parse"):
+                    xls = pd.ExcelFile(file_io)
+            except Exception:
+                return # Yield nothing if parsing fails
+
+            with xls:
+                # Sheets are parsed one at a time so only one DataFrame is alive
+                for sheet_name in xls.sheet_names:
+                    if not self._wants_sheet(str(sheet_name)):
+                        continue
+                    try:
+                        with stage("parse"):
+                            df = xls.parse(sheet_name, nrows=self.max_rows)
+                    except Exception:
+                        continue
+                    yield df, str(sheet_name)
+
+    def _iter_xlsx_streaming(self):
+        """
+        Emits units while reading the XLSX row by row (openpyxl read-only mode).
+        Like pd.read_excel, the first row of each sheet is the header
+        and data rows are numbered from 1. Cells are rendered as stored
+        (no float upcasting of int columns that contain blanks).
+        """
+        with self.open_stream() as file_io:
+            try:
+                with stage("parse"):
+                    workbook = openpyxl.load_workbook(file_io, read_only=True, data_only=True)
+            except Exception:
+                return # Yield nothing if parsing fails
+
+            try:
+                for sheet in workbook.worksheets:
+                    if not self._wants_sheet(sheet.title):
+                        continue
+
+                    rows = sheet.iter_rows(values_only=True)
+                    # Skip the header row
+                    next(rows, None)
+                    for number, values in enumerate(rows, start=1):
+                        if self.max_rows and number > self.max_rows:
+                            break
+
+                        row_values = [str(x) for x in values if x is not None and str(x).strip()]
+                        if not row_values:
+                            continue
+
+                        yield ExtractedUnit(
+                            text=" | ".join(row_values),
+                            source=sheet.title,
+                            location=Location(type="row", number=number, sheet=sheet.title)
+                        )
+            finally:
+                workbook.close()
+
+    def _iter_csv(self):
+        with self.open_stream() as file_io:
+            try:
+                reader = pd.read_csv(file_io, header=None, chunksize=self.chunk_rows, nrows=self.max_rows)
+                # The row index keeps counting across chunks, so row numbers match a full read
+                while True:
+                    with stage("parse"):
+                        chunk = next(reader, None)
+                    if chunk is None:
+                        break
+                    yield chunk, "csv"
+            except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError, ValueError):
+                return # Stop quietly if parsing fails
 
-    def extract(self):
-        units = []
-        file_io = io.BytesIO(self.file_bytes)
-        
-        try:
-            if self.is_csv:
-                dfs = {'csv': pd.read_csv(file_io, header=None)}
-            else:
-                # Read all sheets from Excel
-                dfs = pd.read_excel(file_io, sheet_name=None)
-        except Exception:
-            return [] # Return empty if parsing fails
-
-        for sheet_name, df in dfs.items():
-            # Replace NaNs with empty string
-            df = df.fillna("")
-            
-            # Iterate rows
-            for index, row in df.iterrows():
-                # Join row values with a pipe delimiter for readability
-                row_values = [str(x) for x in row.values if str(x).strip()]
-                if not row_values:
-                    continue
-                    
-                row_text = " | ".join(row_values)
-                
-                units.append(ExtractedUnit(
-                    text=row_text,
-                    source=str(sheet_name),
-                    location=Location(type="row", number=index+1, sheet=str(sheet_name))
-                ))
-        return units
\ No newline at end of file
+    def _frame_to_units(self, df, sheet_name):
+        with stage("parse"):
+            texts = rows_to_text(df)
+        rows = [(index, row_text) for index, row_text in zip(df.index.tolist(), texts.tolist()) if row_text]
+        for i, (index, row_text) in enumerate(rows):
+            self._left = len(rows) - i - 1
+            yield ExtractedUnit(
+                text=row_text,
+                source=sheet_name,
+                location=Location(type="row", number=index+1, sheet=sheet_name)
+            )
@@ -1,22 +1,181 @@
+import codecs
+import re
+import time
+from collections import Counter, deque
+from html.parser import HTMLParser
 from bs4 import BeautifulSoup
+from app import config
 from app.extractors.base import BaseExtractor
+from app.metrics import record_stage, stage
 from app.schemas import ExtractedUnit, Location
+from app.uploads import CHUNK_SIZE
+
+# Elements whose content never becomes text (<meta> is void, so it has none to skip):
+# script/style/noscript are removed on purpose, and get_text() leaves out the strings
+# of <template> and of ruby annotations (<rt>, <rp>)
+SKIPPED_TAGS = {"script", "style", "noscript", "template", "rt", "rp"}
+
+# Void elements (bs4's HTMLTreeBuilder list): they never stay open, so they can't hold text
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "menuitem", "meta",
+    "param", "source", "track", "wbr", "basefont", "bgsound", "command", "frame", "image", "isindex",
+    "nextid", "spacer",
+}
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+_BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+
+
+def _sniff_encoding(head: bytes) -> str:
+    """BOM, then <meta charset> in the first bytes, then UTF-8."""
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    match = _META_CHARSET.search(head)
+    if match:
+        try:
+            return codecs.lookup(match.group(1).decode("ascii")).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+class _TextTokenizer(HTMLParser):
+    """
+    Incremental tokenizer that keeps only text: every text node (and CDATA
+    section) outside SKIPPED_TAGS is split into stripped, non-empty lines,
+    which is what soup.get_text(separator='\\n') + splitlines() produced.
+    No tree is built; only the names of the open elements are kept, so an end
+    tag closes whatever was left open inside it, as it does in the soup.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines = deque()
+        self._open = []
+        # How many of each name are on _open, so an end tag finds its start tag in O(1)
+        self._open_counts = Counter()
+        # Void tags that were closed on the spot; a later </br> for one of them is dropped, as in bs4
+        self._closed_voids = Counter()
+        self._skip_depth = 0
+        self._data = []
+
+    def _flush(self):
+        # A text node can arrive in several pieces; it ends at the next tag/comment
+        if self._data:
+            text = "".join(self._data)
+            self._data = []
+            self.lines.extend(line.strip() for line in text.splitlines() if line.strip())
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in VOID_TAGS:
+            self._closed_voids[tag] += 1
+            return
+        self._open.append(tag)
+        self._open_counts[tag] += 1
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if self._closed_voids[tag]:
+            self._closed_voids[tag] -= 1
+            return
+        self._flush()
+        # An end tag without a matching start tag is ignored
+        if not self._open_counts[tag]:
+            return
+        while True:
+            name = self._open.pop()
+            self._open_counts[name] -= 1
+            if name in SKIPPED_TAGS:
+                self._skip_depth -= 1
+            if name == tag:
+                return
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._data.append(data)
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def unknown_decl(self, data):
+        # <![CDATA[...]]> is a text node of its own, which get_text() keeps even inside
+        # <template> or <rt>; only a removed <noscript> takes it along. Other <![...]> hold no text
+        self._flush()
+        if data.upper().startswith("CDATA[") and not self._open_counts["noscript"]:
+            self._data.append(data[len("CDATA["):])
+            self._flush()
+
+    def close(self):
+        super().close()
+        self._flush()
+
 
 class HTMLExtractor(BaseExtractor):
-    def extract(self):
-        soup = BeautifulSoup(self.file_bytes, 'html.parser')
-        
-        # Security: Remove JS and CSS
-        for script in soup(["script", "style", "meta", "noscript"]):
-            script.decompose()
-        
-        # Get text with newlines
-        text = soup.get_text(separator='\n')
-        
+    def __init__(self, source, filename, engine=None):
+        super().__init__(source, filename)
+        # "streaming" tokenizes chunk by chunk; "bs4" builds a BeautifulSoup tree
+        self.engine = engine or config.HTML_ENGINE
+
+    def iter_units(self):
+        lines = self._iter_lines_bs4() if self.engine == "bs4" else self._iter_lines_streaming()
+        for i, line in enumerate(lines):
+            yield ExtractedUnit(
+                text=line,
+                source="html_body",
+                location=Location(type="row", number=i+1)
+            )
+
+    def _iter_lines_streaming(self):
+        """Feeds the document in chunks and hands out lines as soon as their text node closes."""
+        parse_seconds = 0.0
+        with self.open_stream() as stream:
+            start = time.perf_counter()
+            chunk = stream.read(CHUNK_SIZE)
+            decoder = codecs.getincrementaldecoder(_sniff_encoding(chunk))(errors="replace")
+            tokenizer = _TextTokenizer()
+            while chunk:
+                tokenizer.feed(decoder.decode(chunk))
+                # Reading one chunk ahead tells has_more() whether the queued lines are the last ones
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    tokenizer.feed(decoder.decode(b"", final=True))
+                    tokenizer.close()
+                parse_seconds += time.perf_counter() - start
+                while tokenizer.lines:
+                    line = tokenizer.lines.popleft()
+                    self._left = len(tokenizer.lines) + (1 if chunk else 0)
+                    yield line
+                if chunk and self.limits.expired():
+                    self.truncated = True
+                    return
+                start = time.perf_counter()
+        record_stage("parse", parse_seconds)
+
+    def _iter_lines_bs4(self):
+        with stage("parse"):
+            with self.open_stream() as stream:
+                soup = BeautifulSoup(stream, 'html.parser')
+
+            # Security: Remove JS and CSS
+            for script in soup(["script", "style", "meta", "noscript"]):
+                script.decompose()
+
+            # Get text with newlines
+            text = soup.get_text(separator='\n')
+
         lines = [line.strip() for line in text.splitlines() if line.strip()]
-        
-        return [ExtractedUnit(
-            text=line,
-            source="html_body",
-            location=Location(type="row", number=i+1)
-        ) for i, line in enumerate(lines)]
\ No newline at end of file
+        for i, line in enumerate(lines):
+            self._left = len(lines) - i - 1
+            yield line
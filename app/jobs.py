@@ -0,0 +1,166 @@
+import itertools
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from app.uploads import Source, release
+
+# Lower number = served first
+PRIORITY_LEVELS = {"high": 0, "normal": 1, "low": 2}
+
+
+class QueueFullError(Exception):
+    """
+    Raised when work can't be queued: a job would exceed the queued-bytes
+    budget, or an /api/extract format has too many requests waiting.
+    """
+
+
+class Job:
+    """A single extraction request travelling through the JobQueue."""
+
+    def __init__(self, source: Source, filename: str, priority: str):
+        self.id = uuid.uuid4().hex
+        self.source = source
+        self.filename = filename
+        self.priority = priority
+        self.size = len(source)
+        self.status = "queued"
+        self.pages_done = 0
+        self.pages_total: Optional[int] = None
+        self.result = None
+        # Bytes the result is counted as against max_result_bytes
+        self.result_size = 0
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def set_progress(self, done: int, total: int):
+        self.pages_done = done
+        self.pages_total = total
+
+
+class JobQueue:
+    """
+    In-process priority work queue drained by a fixed pool of worker threads.
+    `handler(source, filename, progress_callback)` does the actual work.
+    Jobs are refused (QueueFullError) once the bytes waiting in the queue
+    would exceed `max_queued_bytes`, so the service sheds load instead of
+    piling up work it can't finish.
+    Results of finished jobs are kept for `result_ttl` seconds and up to
+    `max_result_bytes` in total (as measured by `result_size`); past that the
+    oldest are dropped and their job is marked "expired" (0 disables a bound).
+    """
+
+    def __init__(self, handler: Callable, workers: int, max_queued_bytes: int, max_finished_jobs: int = 1000,
+                 result_ttl: float = 0, max_result_bytes: int = 0, result_size: Optional[Callable] = None):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_queued_bytes = max_queued_bytes
+        self.max_finished_jobs = max_finished_jobs
+        self.result_ttl = result_ttl
+        self.max_result_bytes = max_result_bytes
+        self.result_size = result_size or (lambda result: 0)
+        self.queued_bytes = 0
+        self.result_bytes = 0
+        self._queue = queue.PriorityQueue()
+        self._jobs = OrderedDict()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def submit(self, source: Source, filename: str, priority: str = "normal") -> Job:
+        job = Job(source, filename, priority)
+        with self._lock:
+            if self.queued_bytes + job.size > self.max_queued_bytes:
+                raise QueueFullError(f"Job queue is full ({self.queued_bytes} bytes waiting)")
+            self.queued_bytes += job.size
+            self._jobs[job.id] = job
+            self._start_workers()
+
+        # The sequence number keeps FIFO order within a priority level
+        self._queue.put((PRIORITY_LEVELS[priority], next(self._sequence), job))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            # Expiry is also checked here, since no job may have finished in a while
+            self._expire_results()
+            return self._jobs.get(job_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queued_jobs": self._queue.qsize(),
+                "queued_bytes": self.queued_bytes,
+                "max_queued_bytes": self.max_queued_bytes,
+                "result_bytes": self.result_bytes,
+                "workers": self.workers,
+            }
+
+    def _start_workers(self):
+        # Threads are started on first use so importing the app stays cheap
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker_loop, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker_loop(self):
+        while True:
+            _, _, job = self._queue.get()
+            with self._lock:
+                self.queued_bytes -= job.size
+            job.status = "running"
+
+            try:
+                result = self.handler(job.source, job.filename, job.set_progress)
+                size = self.result_size(result) if result is not None else 0
+                with self._lock:
+                    job.result, job.result_size, job.status = result, size, "done"
+                    self.result_bytes += size
+            except Exception as e:
+                job.error = getattr(e, "detail", None) or str(e)
+                job.status = "failed"
+            finally:
+                # The upload isn't needed anymore, only the result
+                release(job.source)
+                job.source = None
+                job.finished_at = time.time()
+                self._forget_old_jobs(job)
+                self._queue.task_done()
+
+    def _forget_old_jobs(self, newest: Job):
+        """
+        Keeps only the most recent `max_finished_jobs` finished jobs around, and drops the
+        oldest results while they add up to more than max_result_bytes. The newest result
+        stays even when it alone is over the budget, or it could never be fetched.
+        """
+        with self._lock:
+            self._expire_results()
+            for job in self._jobs.values():
+                if not self.max_result_bytes or self.result_bytes <= self.max_result_bytes:
+                    break
+                if job.status == "done" and job is not newest:
+                    self._drop_result(job)
+            finished = [job_id for job_id, job in self._jobs.items() if job.status in ("done", "failed", "expired")]
+            for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+                self._drop_result(self._jobs.pop(job_id))
+
+    def _expire_results(self):
+        """Drops the results that finished more than result_ttl seconds ago (lock held)."""
+        if not self.result_ttl:
+            return
+        cutoff = time.time() - self.result_ttl
+        for job in self._jobs.values():
+            if job.status == "done" and job.finished_at is not None and job.finished_at < cutoff:
+                self._drop_result(job)
+
+    def _drop_result(self, job: Job):
+        if job.status == "done":
+            job.status = "expired"
+        job.result = None
+        self.result_bytes -= job.result_size
+        job.result_size = 0
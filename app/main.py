@@ -1,29 +1,41 @@
+import json
 import magic
-import sys
+import threading
 import time
-import pytesseract
 import os
-from fastapi import FastAPI, UploadFile, HTTPException
+import zipfile
+from contextlib import AsyncExitStack, asynccontextmanager
+from concurrent.futures import Future, as_completed
+from typing import List, Literal, Optional
+from fastapi import FastAPI, UploadFile, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 
-from app.schemas import DocumentResponse
-from app.extractors.documents import PDFExtractor, WordExtractor
-from app.extractors.tables import TableExtractor
-from app.extractors.images import ImageExtractor
-from app.extractors.web import HTMLExtractor
+from app import config
+from app.cache import result_cache, make_cache_key
+from app.jobs import JobQueue, QueueFullError
+from app.metrics import BYTES_IN, REQUEST_SECONDS, REQUESTS, UNITS_OUT, collect_timings, render_metrics, stage
+from app.pools import shutdown_pools
+from app.scheduler import batch_scheduler, extract_gate, extract_in_pool, extract_in_thread
+from app.schemas import BatchItem, BatchResponse, ColumnarDocumentResponse, DocumentResponse, ExtractedUnit, JobStatus, UnitColumns
+from app.uploads import (
+    Source, SpooledUpload, UploadTooLargeError, as_buffer, expand_zip, read_header, release, spool_upload, spool_upload_async
+)
+from app.extractors.base import ExtractionLimits
+from app.extractors.registry import registry
 
-if sys.platform.startswith('win'):
-    tesseract_base_path = r'C:\Program Files\Tesseract-OCR'
-    executable_path = os.path.join(tesseract_base_path, 'tesseract.exe')
-    tessdata_path = os.path.join(tesseract_base_path, 'tessdata')
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Preloads the formats listed in WARMUP_FORMATS in the background, so / answers right away
+    if config.WARMUP_FORMATS:
+        threading.Thread(target=registry.warm_up, args=(config.WARMUP_FORMATS,), daemon=True).start()
+    yield
+    shutdown_pools()
 
-    if os.path.exists(executable_path):
-        pytesseract.pytesseract.tesseract_cmd = executable_path
-        os.environ['TESSDATA_PREFIX'] = tessdata_path
-    else:
-        print("⚠️ WARNING: Tesseract.exe not found on Windows.")
 
-app = FastAPI(title="Universal Text Extractor API")
+app = FastAPI(title="Universal Text Extractor API", lifespan=lifespan)
 
 #
 
@@ -34,90 +46,605 @@ app.add_middleware(
     allow_methods=["*"],     
     allow_headers=["*"],     
 )
-#THIS IS USED TO MAP EACH FILE TYPE TO RESPECTIVE METHODS
-EXTRACTOR_MAP = {
-    "application/pdf": PDFExtractor,
-    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": WordExtractor,
-    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": TableExtractor,
-    "application/vnd.ms-excel": TableExtractor,
-    "text/csv": lambda f, n: TableExtractor(f, n, is_csv=True),
-    "text/plain": lambda f, n: TableExtractor(f, n, is_csv=True),
-    "image/png": ImageExtractor,
-    "image/jpeg": ImageExtractor,
-    "image/tiff": ImageExtractor,
-    "text/html": HTMLExtractor
-}
+#EACH FILE TYPE IS MAPPED TO ITS EXTRACTOR IN app/extractors/registry.py
+#(the heavy parsing libraries are only imported when a format is first used)
 #THIS IS THE MAIN ROUTE
 @app.get("/")
 def health_check():
     return {"status": "active", "service": "text-extractor-v1"}
 
 
-@app.post("/api/extract", response_model=DocumentResponse)
-def extract_file(file: UploadFile):
-    start_time = time.time()
-    #REASDS THE FILE
-    try:
-        file_bytes = file.file.read()
-    except Exception:
-        raise HTTPException(status_code=400, detail="Corrupt or unreadable file")
+@app.get("/api/cache/stats")
+def cache_stats():
+    return result_cache.stats()
+
 
+@app.get("/api/extract/stats")
+def extract_stats():
+    """Running / waiting /api/extract requests per format."""
+    return extract_gate.stats()
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+def detect_extractor(source: Source, filename: str):
+    """Picks the extractor from the file header, falling back to the extension."""
     #  Detect Type
     try:
-        mime_type = magic.from_buffer(file_bytes, mime=True)
+        # libmagic only needs the header, not the whole (possibly huge) file
+        with stage("mime_sniff"):
+            mime_type = magic.from_buffer(read_header(source), mime=True)
     except Exception:
         mime_type = "application/octet-stream"
 
-    print(f"DEBUG: Processing '{file.filename}' ({mime_type})")
+    print(f"DEBUG: Processing '{filename}' ({mime_type})")
 
-    extractor_class = EXTRACTOR_MAP.get(mime_type)
+    extractor_class = registry.get(mime_type)
     
     if not extractor_class or mime_type == "application/octet-stream":
-        lower_name = file.filename.lower()
-        if lower_name.endswith('.docx'):
-             extractor_class = WordExtractor
-             mime_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-        elif lower_name.endswith('.pdf'):
-             extractor_class = PDFExtractor
-             mime_type = "application/pdf"
-        elif lower_name.endswith('.xlsx'):
-             extractor_class = TableExtractor
-             mime_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        elif lower_name.endswith('.csv'):
-             extractor_class = lambda f, n: TableExtractor(f, n, is_csv=True)
-             mime_type = "text/csv"
-        elif lower_name.endswith('.txt'):
-             extractor_class = lambda f, n: TableExtractor(f, n, is_csv=True)
-             mime_type = "text/plain"
-        elif lower_name.endswith(('.png', '.jpg', '.jpeg')):
-             extractor_class = ImageExtractor
-             mime_type = "image/png"
-        else: 
+        fallback = registry.for_filename(filename)
+        if fallback is None:
             supported_formats = "PDF, DOCX, XLSX, CSV, TXT, HTML, PNG, JPG"
             raise HTTPException(
                 status_code=400, 
                 detail=f"Unsupported format: {mime_type}. Supported types: {supported_formats}"
             )
+        extractor_class, mime_type = fallback
+
+    return extractor_class, mime_type
+
+
+# Settings that change what an extraction returns; the SQLite tier outlives a restart with new settings
+RESULT_SETTINGS = (
+    "XLSX_ENGINE", "DOCX_ENGINE", "HTML_ENGINE",
+    "OCR_ENGINE", "OCR_LANG", "OCR_PREPROCESS", "OCR_TARGET_DPI", "OCR_TILE_PIXELS", "OCR_TILE_OVERLAP_PX",
+    "OCR_PREPASS_DPI", "OCR_MIN_DPI", "OCR_MAX_DPI", "OCR_TARGET_GLYPH_PX", "OCR_BLANK_INK_PPM",
+)
+
+
+def _cache_key(source: Source, filename: str, limits: Optional[ExtractionLimits] = None) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    # A partial extraction is a different result than the full one
+    options = {"extension": extension, **(limits.cache_options() if limits else {})}
+    options["settings"] = {name: getattr(config, name) for name in RESULT_SETTINGS}
+    return make_cache_key(as_buffer(source), options)
+
+
+def _timings_ms(timings: dict) -> dict:
+    return {name: round(seconds * 1000, 2) for name, seconds in timings.items()}
+
+
+# Accept header value that asks /api/extract for the columnar layout
+COLUMNAR_MEDIA_TYPE = "application/vnd.extractor.columnar+json"
+
 
+def _cached_content(cached: dict) -> list:
+    """Cached units as dicts, whichever layout they were stored in."""
+    if "columns" in cached:
+        return UnitColumns.from_dict(cached["columns"]).to_content()
+    return cached["content"]
+
+
+def _cached_columns(cached: dict) -> UnitColumns:
+    if "columns" in cached:
+        return UnitColumns.from_dict(cached["columns"])
+    return UnitColumns.from_content(cached["content"])
+
+
+def _columnar_response(filename, file_type, processing_time_ms, columns: UnitColumns, timings, truncated=False,
+                       skipped_pages=None):
+    # model_construct: the arrays can hold millions of values, validating each one would undo the savings
+    return ColumnarDocumentResponse.model_construct(
+        filename=filename,
+        file_type=file_type,
+        processing_time_ms=processing_time_ms,
+        format="columnar",
+        count=len(columns),
+        columns=columns.to_dict(),
+        timings=timings,
+        truncated=truncated,
+        skipped_pages=skipped_pages
+    )
+
+
+def lookup_cache(source: Source, filename: str, limits: ExtractionLimits, include_timings=False, columnar=False):
+    """
+    Returns (cache_key, cached response or None); the key is None when the cache is off.
+    Same bytes + same extension (+ same limits) => same result, skip sniffing/parsing/OCR.
+    """
+    if not config.CACHE_ENABLED:
+        return None, None
+    start_time = time.time()
+    cache_key = _cache_key(source, filename, limits)
+    cached = result_cache.get(cache_key)
+    if cached is None:
+        return cache_key, None
+
+    REQUESTS.inc(file_type=cached["file_type"], status="cache_hit")
+    elapsed_ms = round((time.time() - start_time) * 1000, 2)
+    timings_ms = {} if include_timings else None
+    truncated = cached.get("truncated", False)
+    skipped_pages = cached.get("skipped_pages")
+    if columnar:
+        columns = _cached_columns(cached)
+        return cache_key, _columnar_response(filename, cached["file_type"], elapsed_ms, columns, timings_ms, truncated,
+                                             skipped_pages)
+    return cache_key, DocumentResponse(
+        filename=filename,
+        file_type=cached["file_type"],
+        processing_time_ms=elapsed_ms,
+        content=_cached_content(cached),
+        timings=timings_ms,
+        truncated=truncated,
+        skipped_pages=skipped_pages
+    )
+
+
+def _detect_timed(source: Source, filename: str):
+    """detect_extractor plus the {stage: seconds} it took, for callers outside process_document."""
+    with collect_timings() as timings:
+        return detect_extractor(source, filename), timings
+
+
+def process_document(source: Source, filename: str, progress_callback=None, detected=None,
+                     include_timings=False, columnar=False, limits: Optional[ExtractionLimits] = None,
+                     cache_key: Optional[str] = None, runner=extract_in_thread, stage_timings: Optional[dict] = None):
+    """
+    Runs the full pipeline (cache -> detect -> extract) for one upload.
+    `detected` lets callers that already ran detect_extractor skip a second sniff.
+    `include_timings` adds the per-stage breakdown to the response.
+    `columnar` extracts into UnitColumns and returns a ColumnarDocumentResponse.
+    `limits` restricts the extraction (pages, sheets, max_units, max_time_ms).
+    `cache_key` comes from a lookup_cache() the caller already did (a miss), so it isn't repeated.
+    `runner` does the extraction itself (extract_in_thread, or extract_in_pool).
+    `stage_timings` are stages the caller already timed (e.g. its own sniff), added to the breakdown.
+    Returns (response, cache_status) where cache_status is HIT, MISS or BYPASS.
+    """
+    start_time = time.time()
+    limits = limits or ExtractionLimits()
+
+    cache_status = "BYPASS"
+    if config.CACHE_ENABLED:
+        if cache_key is None:
+            cache_key, cached = lookup_cache(source, filename, limits, include_timings, columnar)
+            if cached is not None:
+                return cached, "HIT"
+        cache_status = "MISS"
+
+    with collect_timings() as timings:
+        timings.update(stage_timings or {})
+        try:
+            extractor_class, mime_type = detected or detect_extractor(source, filename)
+        except HTTPException:
+            REQUESTS.inc(file_type="unknown", status="unsupported")
+            raise
+        file_type = registry.file_type(mime_type)
+        BYTES_IN.inc(len(source), file_type=file_type)
+
+        try:
+            content, truncated, skipped_pages = runner(extractor_class, mime_type, source, filename, limits, columnar,
+                                                       progress_callback)
+            skipped_pages = skipped_pages or None
+        except Exception as e:
+            print(f"ERROR: {e}")
+            REQUESTS.inc(file_type=file_type, status="error")
+            raise HTTPException(500, detail=f"Extraction failed: {str(e)}")
+
+    elapsed = time.time() - start_time
+    REQUESTS.inc(file_type=file_type, status="ok")
+    REQUEST_SECONDS.observe(elapsed, file_type=file_type)
+    UNITS_OUT.inc(len(content), file_type=file_type)
+
+    timings_ms = _timings_ms(timings) if include_timings else None
+    if columnar:
+        result = _columnar_response(filename, file_type, round(elapsed * 1000, 2), content, timings_ms, truncated,
+                                    skipped_pages)
+        stored = {"file_type": file_type, "columns": result.columns, "truncated": truncated}
+    else:
+        result = DocumentResponse(
+            filename=filename,
+            file_type=file_type,
+            processing_time_ms=round(elapsed * 1000, 2),
+            content=content,
+            timings=timings_ms,
+            truncated=truncated,
+            skipped_pages=skipped_pages
+        )
+        stored = {"file_type": file_type, "content": [unit.model_dump() for unit in result.content], "truncated": truncated}
+    stored["skipped_pages"] = skipped_pages
+
+    # Where a time limit cut the result depends on the machine's load, so it isn't reused
+    if cache_key is not None and not (truncated and limits.max_time_ms):
+        result_cache.put(cache_key, stored)
+
+    return result, cache_status
+
+
+def _stream_cached(source: Source, filename: str, limits: ExtractionLimits) -> Optional[dict]:
+    """The cache entry a streamed extraction would be served from, if any."""
+    return result_cache.get(_cache_key(source, filename, limits)) if config.CACHE_ENABLED else None
+
+
+def stream_document(source: Source, filename: str, limits: Optional[ExtractionLimits] = None,
+                    detected=None) -> StreamingResponse:
+    """
+    NDJSON variant of process_document: one {"type": "unit", ...} line per unit
+    as soon as the extractor yields it, then a {"type": "summary", ...} line.
+    Streamed results are served from the cache but not stored in it,
+    since that would mean holding the whole document in memory again.
+    `detected` comes from a caller that already missed the cache and ran detect_extractor.
+    """
+    start_time = time.time()
+    limits = limits or ExtractionLimits()
+    cached = _stream_cached(source, filename, limits) if detected is None else None
+    extractor = None
+
+    if cached is not None:
+        file_type = cached["file_type"]
+        units = (ExtractedUnit(**unit) for unit in _cached_content(cached))
+        cache_status = "HIT"
+        REQUESTS.inc(file_type=file_type, status="cache_hit")
+    else:
+        # Detection happens before the response starts so errors are still plain 400s
+        extractor_class, mime_type = detected or detect_extractor(source, filename)
+        file_type = registry.file_type(mime_type)
+        BYTES_IN.inc(len(source), file_type=file_type)
+        extractor = extractor_class(source, filename)
+        extractor.limits = limits
+        units = extractor.iter_limited()
+        cache_status = "BYPASS"
+
+    def generate():
+        count = 0
+        try:
+            for unit in units:
+                count += 1
+                yield json.dumps({"type": "unit", **unit.model_dump()}) + "\n"
+        except Exception as e:
+            # Headers are already sent, so the failure has to travel in-band
+            print(f"ERROR: {e}")
+            if extractor:
+                REQUESTS.inc(file_type=file_type, status="error")
+            yield json.dumps({"type": "error", "detail": f"Extraction failed: {str(e)}"}) + "\n"
+            return
+
+        if extractor:
+            # Recorded once the last unit is out, like process_document does for the whole response
+            REQUESTS.inc(file_type=file_type, status="ok")
+            REQUEST_SECONDS.observe(time.time() - start_time, file_type=file_type)
+            UNITS_OUT.inc(count, file_type=file_type)
+        yield json.dumps({
+            "type": "summary",
+            "filename": filename,
+            "file_type": file_type,
+            "unit_count": count,
+            "truncated": extractor.truncated if extractor else cached.get("truncated", False),
+            "skipped_pages": (extractor.skipped_pages or None) if extractor else cached.get("skipped_pages"),
+            "processing_time_ms": round((time.time() - start_time) * 1000, 2)
+        }) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson", headers={"X-Cache": cache_status})
+
+
+@asynccontextmanager
+async def _admitted(mime_type: str):
+    """extract_gate.admit() for one request; a full waiting line becomes a 503 with Retry-After."""
+    file_type = registry.file_type(mime_type)
     try:
-        extractor = extractor_class(file_bytes, file.filename)
-        content = extractor.extract()
-    except Exception as e:
-        print(f"ERROR: {e}")
-        raise HTTPException(500, detail=f"Extraction failed: {str(e)}")
-
-    type_mapping = {
-        "application/pdf": "pdf",
-        "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
-        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "xlsx",
-        "text/csv": "csv",
-        "text/plain": "txt",
-        "image/png": "png", "image/jpeg": "jpg", "text/html": "html"
-    }
-    
-    return DocumentResponse(
-        filename=file.filename,
-        file_type=type_mapping.get(mime_type, mime_type),
-        processing_time_ms=round((time.time() - start_time) * 1000, 2),
-        content=content
-    )
\ No newline at end of file
+        async with extract_gate.admit(file_type, mime_type):
+            yield
+    except QueueFullError as e:
+        REQUESTS.inc(file_type=file_type, status="rejected")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(config.EXTRACT_RETRY_AFTER)})
+
+
+async def _stream_admitted(source: Source, filename: str, limits: ExtractionLimits) -> StreamingResponse:
+    """
+    stream_document behind extract_gate. As on the plain path, cache hits start
+    right away and misses wait for a slot of their format; the slot is held
+    until the body has been sent (or abandoned), not just until the headers are.
+    """
+    slot = AsyncExitStack()
+    try:
+        detected = None
+        if await run_in_threadpool(_stream_cached, source, filename, limits) is None:
+            try:
+                detected = await run_in_threadpool(detect_extractor, source, filename)
+            except HTTPException:
+                REQUESTS.inc(file_type="unknown", status="unsupported")
+                raise
+            await slot.enter_async_context(_admitted(detected[1]))
+        streaming = await run_in_threadpool(stream_document, source, filename, limits, detected)
+    except BaseException:
+        await slot.aclose()
+        raise
+
+    async def body(chunks):
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await slot.aclose()
+
+    streaming.body_iterator = body(streaming.body_iterator)
+    return streaming
+
+
+def receive_upload(file: UploadFile) -> SpooledUpload:
+    """Spools the upload to disk (never fully into RAM), enforcing MAX_UPLOAD_BYTES."""
+    try:
+        return spool_upload(file.file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Corrupt or unreadable file")
+
+
+async def receive_upload_async(file: UploadFile) -> SpooledUpload:
+    """receive_upload for async routes: reads the upload without blocking the event loop."""
+    try:
+        return await spool_upload_async(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Corrupt or unreadable file")
+
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Refuses uploads by Content-Length before the body is even received."""
+    content_length = request.headers.get("content-length")
+    # A batch carries many files, so its body is held to the batch total; each file is still checked on its own
+    max_bytes = config.BATCH_MAX_BYTES if request.url.path == "/api/extract/batch" else config.MAX_UPLOAD_BYTES
+    # Multipart framing adds a little on top of the file itself
+    limit = max_bytes + 64 * 1024
+    if max_bytes and content_length and content_length.isdigit() and int(content_length) > limit:
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Upload exceeds the {max_bytes} byte limit"}
+        )
+    return await call_next(request)
+
+
+def parse_limits(pages: Optional[str], sheets: Optional[str], max_units: Optional[int],
+                 max_time_ms: Optional[int]) -> ExtractionLimits:
+    """Turns the partial-extraction query parameters into ExtractionLimits (400 on a bad page range)."""
+    try:
+        page_ranges = ExtractionLimits.parse_pages(pages) if pages else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid pages parameter: {pages!r} (expected e.g. 1-5,8)")
+    sheet_names = [name.strip() for name in sheets.split(",") if name.strip()] if sheets else None
+    return ExtractionLimits(page_ranges, sheet_names, max_units, max_time_ms)
+
+
+@app.post("/api/extract", response_model=DocumentResponse)
+async def extract_file(
+    file: UploadFile,
+    request: Request,
+    response: Response,
+    stream: Optional[Literal["ndjson"]] = None,
+    timings: bool = False,
+    output_format: Optional[Literal["json", "columnar"]] = Query(None, alias="format"),
+    pages: Optional[str] = None,
+    sheets: Optional[str] = None,
+    max_units: Optional[int] = Query(None, ge=1),
+    max_time_ms: Optional[int] = Query(None, ge=1),
+):
+    limits = parse_limits(pages, sheets, max_units, max_time_ms)
+    #READS THE FILE (spooled to disk + memory-mapped)
+    source = await receive_upload_async(file)
+    # Columnar is opt-in: ?format=columnar or Accept: application/vnd.extractor.columnar+json
+    columnar = output_format == "columnar" or (
+        output_format is None and COLUMNAR_MEDIA_TYPE in request.headers.get("accept", "")
+    )
+
+    if stream == "ndjson":
+        try:
+            streaming = await _stream_admitted(source, file.filename, limits)
+        except BaseException:
+            # No response will be sent (e.g. unsupported format, full queue), so nothing else would remove the file
+            release(source)
+            raise
+        # The spool file has to outlive the generator, so it is removed once the body is sent
+        streaming.background = BackgroundTask(release, source)
+        return streaming
+
+    try:
+        # Hashing, sniffing and the extraction itself stay off the event loop
+        cache_key, result = await run_in_threadpool(lookup_cache, source, file.filename, limits, timings, columnar)
+        cache_status = "HIT"
+        if result is None:
+            try:
+                detected, sniff_timings = await run_in_threadpool(_detect_timed, source, file.filename)
+            except HTTPException:
+                REQUESTS.inc(file_type="unknown", status="unsupported")
+                raise
+            # Cache hits never queue; misses wait for a slot of their format
+            async with _admitted(detected[1]):
+                result, cache_status = await run_in_threadpool(
+                    process_document, source, file.filename, detected=detected, include_timings=timings,
+                    columnar=columnar, limits=limits, cache_key=cache_key, runner=extract_in_pool,
+                    stage_timings=sniff_timings
+                )
+    finally:
+        release(source)
+    if columnar:
+        return JSONResponse(result.model_dump(), media_type=COLUMNAR_MEDIA_TYPE, headers={"X-Cache": cache_status})
+    response.headers["X-Cache"] = cache_status
+    return result
+
+
+def _collect_batch(files: List[UploadFile]):
+    """Spools every upload; .zip archives are expanded into their members."""
+    sources = []
+    try:
+        for file in files:
+            source = receive_upload(file)
+            is_zip = (file.filename or "").lower().endswith(".zip") or \
+                magic.from_buffer(read_header(source), mime=True) == "application/zip"
+
+            # What is left of BATCH_MAX_BYTES for this file (or the members of this zip)
+            budget = None
+            if config.BATCH_MAX_BYTES:
+                budget = config.BATCH_MAX_BYTES - sum(len(spooled) for _, spooled in sources)
+            if not is_zip:
+                sources.append((file.filename, source))
+                if budget is not None and len(source) > budget:
+                    raise HTTPException(status_code=413, detail=f"Batch exceeds the {config.BATCH_MAX_BYTES} byte limit")
+            else:
+                try:
+                    total_bytes = max(1, budget) if budget is not None else None
+                    sources.extend(expand_zip(source, config.BATCH_MAX_FILES, config.MAX_UPLOAD_BYTES, total_bytes))
+                except UploadTooLargeError as e:
+                    raise HTTPException(status_code=413, detail=str(e))
+                except (zipfile.BadZipFile, ValueError) as e:
+                    raise HTTPException(status_code=400, detail=f"Unreadable archive {file.filename}: {e}")
+                finally:
+                    release(source)
+
+            if len(sources) > config.BATCH_MAX_FILES:
+                raise HTTPException(status_code=400, detail=f"Batch is limited to {config.BATCH_MAX_FILES} files")
+    except BaseException:
+        for _, source in sources:
+            release(source)
+        raise
+
+    return sources
+
+
+def _run_batch_item(filename: str, source: Source, detected, submitted_at: float) -> BatchItem:
+    """Runs inside a scheduler lane once the file has been admitted."""
+    started_at = time.time()
+    try:
+        result, _ = process_document(source, filename, detected=detected)
+        return BatchItem(
+            filename=filename,
+            status="ok",
+            queued_ms=round((started_at - submitted_at) * 1000, 2),
+            processing_time_ms=result.processing_time_ms,
+            result=result
+        )
+    except HTTPException as e:
+        return BatchItem(
+            filename=filename,
+            status="error",
+            queued_ms=round((started_at - submitted_at) * 1000, 2),
+            processing_time_ms=round((time.time() - started_at) * 1000, 2),
+            error=e.detail
+        )
+    finally:
+        release(source)
+
+
+def _schedule_batch(sources):
+    """Submits every file to the shared BatchScheduler; returns futures in upload order."""
+    futures = []
+    for filename, source in sources:
+        submitted_at = time.time()
+        try:
+            detected = detect_extractor(source, filename)
+        except HTTPException as e:
+            # Unsupported files fail straight away without taking a slot
+            release(source)
+            done = Future()
+            done.set_result(BatchItem(filename=filename, status="error", queued_ms=0, processing_time_ms=0, error=e.detail))
+            futures.append(done)
+            continue
+
+        kind = batch_scheduler.classify(detected[1])
+        futures.append(batch_scheduler.submit(kind, len(source), _run_batch_item, filename, source, detected, submitted_at))
+    return futures
+
+
+@app.post("/api/extract/batch", response_model=BatchResponse)
+def extract_batch(files: List[UploadFile], stream: Optional[Literal["ndjson"]] = None):
+    """
+    Extracts many files (or the members of .zip uploads) in one request.
+    OCR-heavy and cheap formats run in separate lanes under a shared memory budget.
+    """
+    start_time = time.time()
+    futures = _schedule_batch(_collect_batch(files))
+
+    if stream == "ndjson":
+        def generate():
+            # Items are written in completion order, so cheap files come back first
+            for future in as_completed(futures):
+                yield json.dumps({"type": "item", **future.result().model_dump()}) + "\n"
+            yield json.dumps({
+                "type": "summary",
+                "file_count": len(futures),
+                "total_time_ms": round((time.time() - start_time) * 1000, 2)
+            }) + "\n"
+
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+    items = [future.result() for future in futures]
+    return BatchResponse(total_time_ms=round((time.time() - start_time) * 1000, 2), items=items)
+
+
+def _run_job(source: Source, filename: str, progress_callback):
+    result, _ = process_document(source, filename, progress_callback)
+    return result
+
+
+def _job_result_size(result: DocumentResponse) -> int:
+    # The text dominates a result; counting it avoids serializing the whole response again
+    return sum(len(unit.text) for unit in result.content)
+
+
+job_queue = JobQueue(_run_job, workers=config.JOB_WORKERS, max_queued_bytes=config.JOB_MAX_QUEUED_BYTES,
+                     result_ttl=config.JOB_RESULT_TTL, max_result_bytes=config.JOB_RESULT_MAX_BYTES,
+                     result_size=_job_result_size)
+
+
+def _job_status(job) -> JobStatus:
+    return JobStatus(
+        job_id=job.id,
+        status=job.status,
+        filename=job.filename,
+        priority=job.priority,
+        pages_done=job.pages_done,
+        pages_total=job.pages_total,
+        error=job.error
+    )
+
+
+@app.post("/api/jobs", response_model=JobStatus, status_code=202)
+def create_job(file: UploadFile, priority: Literal["high", "normal", "low"] = "normal"):
+    """Queues an extraction and returns immediately with a job id."""
+    source = receive_upload(file)
+
+    try:
+        job = job_queue.submit(source, file.filename, priority)
+    except QueueFullError as e:
+        release(source)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+
+    return _job_status(job)
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatus)
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_status(job)
+
+
+@app.get("/api/jobs/{job_id}/result", response_model=DocumentResponse)
+def get_job_result(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status == "expired":
+        raise HTTPException(status_code=410, detail="Job result has expired")
+    if job.status != "done":
+        # Not ready yet: tell the client to keep polling the status endpoint
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return job.result
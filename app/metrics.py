@@ -0,0 +1,123 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+# Seconds; covers a 1 ms MIME sniff up to a multi-minute OCR job
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Monotonic counter with labels, rendered in Prometheus text format."""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels, rendered in Prometheus text format."""
+
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            # [count per bucket..., +Inf count, sum]
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[idx] += 1
+            series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                for idx, bound in enumerate(self.buckets):
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_format_labels(labels, le)} {series[idx]}")
+                total = series[len(self.buckets)]
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_format_labels(labels, le)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {total}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {series[-1]}")
+        return lines
+
+
+REQUESTS = Counter("extractor_requests_total", "Extractions by file type and outcome")
+REQUEST_SECONDS = Histogram("extractor_request_duration_seconds", "End-to-end extraction time by file type")
+STAGE_SECONDS = Histogram("extractor_stage_duration_seconds", "Time spent per pipeline stage")
+BYTES_IN = Counter("extractor_bytes_in_total", "Uploaded bytes by file type")
+UNITS_OUT = Counter("extractor_units_out_total", "Extracted units by file type")
+
+ALL_METRICS = (REQUESTS, REQUEST_SECONDS, STAGE_SECONDS, BYTES_IN, UNITS_OUT)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Per-request stage timings ---
+
+_timings = contextvars.ContextVar("timings", default=None)
+
+
+def record_stage(name: str, seconds: float):
+    """Adds time to a stage: the global histogram plus the current request's breakdown."""
+    STAGE_SECONDS.observe(seconds, stage=name)
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    """Times a block as one pipeline stage (mime_sniff, parse, rasterize, preprocess, ocr)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+@contextmanager
+def collect_timings():
+    """Collects every stage() inside the block into a {stage: seconds} dict."""
+    timings: Dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
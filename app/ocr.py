@@ -0,0 +1,219 @@
+import hashlib
+import os
+import sys
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+from app import config, pools
+from app.metrics import stage
+from app.pools import ProcessPool
+
+try:
+    import tesserocr
+except ImportError:  # optional: needs libtesseract headers to build
+    tesserocr = None
+
+if sys.platform.startswith('win'):
+    tesseract_base_path = r'C:\Program Files\Tesseract-OCR'
+    executable_path = os.path.join(tesseract_base_path, 'tesseract.exe')
+    tessdata_path = os.path.join(tesseract_base_path, 'tessdata')
+
+    if os.path.exists(executable_path):
+        pytesseract.pytesseract.tesseract_cmd = executable_path
+        os.environ['TESSDATA_PREFIX'] = tessdata_path
+    else:
+        print("⚠️ WARNING: Tesseract.exe not found on Windows.")
+
+
+class OCREngine(ABC):
+    """Turns preprocessed images into text. Every extractor goes through one of these."""
+
+    @abstractmethod
+    def image_to_string(self, image: Image.Image) -> str:
+        pass
+
+    def image_to_string_batch(self, images: List[Image.Image]) -> List[str]:
+        """Recognizes many images at once; results keep the input order."""
+        return [self.image_to_string(image) for image in images]
+
+
+class PytesseractEngine(OCREngine):
+    """
+    The original approach: one `tesseract` subprocess per image.
+    Batches run the subprocesses concurrently from a small thread pool.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._threads = None
+        self._lock = threading.Lock()
+
+    def image_to_string(self, image):
+        return pytesseract.image_to_string(image)
+
+    def image_to_string_batch(self, images):
+        if len(images) <= 1 or self.workers <= 1:
+            return super().image_to_string_batch(images)
+        with self._lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=self.workers)
+        return list(self._threads.map(self.image_to_string, images))
+
+
+# --- tesserocr: the model stays loaded inside long-lived worker processes ---
+
+_warm_api = threading.local()
+
+
+def _get_warm_api():
+    """One PyTessBaseAPI per thread, created once and reused for every image."""
+    api = getattr(_warm_api, "api", None)
+    if api is None:
+        api = tesserocr.PyTessBaseAPI(lang=config.OCR_LANG)
+        _warm_api.api = api
+    return api
+
+
+def _recognize_array(pixels: np.ndarray) -> str:
+    """Worker entry point: arrays pickle cheaper than PIL images."""
+    api = _get_warm_api()
+    api.SetImage(Image.fromarray(pixels))
+    return api.GetUTF8Text()
+
+
+class TesserocrPoolEngine(OCREngine):
+    """
+    Pool of worker processes, each keeping a warm Tesseract API
+    (the LSTM model is loaded once per worker instead of once per image).
+    Calls made from inside another pool worker (e.g. a PDF page worker)
+    use a warm in-process API instead of spawning a nested pool.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._pool = ProcessPool()
+
+    def image_to_string(self, image):
+        return self.image_to_string_batch([image])[0]
+
+    def image_to_string_batch(self, images):
+        arrays = [np.asarray(image) for image in images]
+        if pools.in_worker:
+            return [_recognize_array(pixels) for pixels in arrays]
+        return list(self._pool.get(self.workers).map(_recognize_array, arrays))
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_ocr_engine() -> OCREngine:
+    """
+    Returns the process-wide OCR engine picked by OCR_ENGINE:
+    "tesserocr", "pytesseract", or "auto" (tesserocr when installed).
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            choice = config.OCR_ENGINE
+            if choice == "auto":
+                choice = "tesserocr" if tesserocr is not None else "pytesseract"
+            if choice == "tesserocr" and tesserocr is not None:
+                _engine = TesserocrPoolEngine(config.OCR_WORKERS)
+            else:
+                _engine = PytesseractEngine(config.OCR_WORKERS)
+        return _engine
+
+
+def ocr_image(image: Image.Image) -> str:
+    with stage("ocr"):
+        return get_ocr_engine().image_to_string(image)
+
+
+def ocr_images(images: List[Image.Image]) -> List[str]:
+    with stage("ocr"):
+        return get_ocr_engine().image_to_string_batch(images)
+
+
+# --- OCR result deduplication ---
+
+def image_key(data) -> str:
+    """
+    Content hash of an image: encoded bytes (e.g. a DOCX media blob)
+    or decoded pixels (shape and dtype are part of the key).
+    """
+    digest = hashlib.sha256()
+    if isinstance(data, np.ndarray):
+        digest.update(f"{data.shape}{data.dtype}".encode("ascii"))
+        data = np.ascontiguousarray(data)
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """Process-wide LRU of OCR text keyed by image_key(); max_entries <= 0 disables it."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._entries.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key: str, text: str):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+ocr_cache = OCRCache(config.OCR_CACHE_ENTRIES)
+
+
+class DocumentOCRCache:
+    """
+    Per-document layer in front of the shared ocr_cache: a logo repeated on
+    every page is recognized once per document even if the shared LRU evicts it.
+    """
+
+    def __init__(self, shared: OCRCache = None):
+        self.shared = ocr_cache if shared is None else shared
+        self._local = {}
+
+    def get(self, key: str) -> Optional[str]:
+        text = self._local.get(key)
+        if text is None:
+            text = self.shared.get(key)
+            if text is not None:
+                self._local[key] = text
+        return text
+
+    def put(self, key: str, text: str):
+        self._local[key] = text
+        self.shared.put(key, text)
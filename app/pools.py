@@ -0,0 +1,57 @@
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+
+# True inside a ProcessPool worker. Unlike multiprocessing.parent_process(), it stays False in
+# uvicorn --workers/--reload processes, which are children too but should still use the pools
+in_worker = False
+
+
+def _init_worker():
+    global in_worker
+    in_worker = True
+    # Forked workers inherit uvicorn's SIGINT/SIGTERM handlers, which would make them ignore a shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+class ProcessPool:
+    """
+    A ProcessPoolExecutor that is only started on first use. Its workers get
+    the default signal handlers back, and every pool can be stopped at app
+    shutdown with shutdown_pools().
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        with _pools_lock:
+            _pools.append(self)
+
+    def get(self, max_workers: int) -> ProcessPoolExecutor:
+        """The running executor; `max_workers` only matters for the call that starts it."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=max(1, max_workers), initializer=_init_worker)
+            return self._executor
+
+    def shutdown(self):
+        """Stops the workers and drops queued tasks; the next get() starts a fresh pool."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+
+_pools: List[ProcessPool] = []
+_pools_lock = threading.Lock()
+
+
+def shutdown_pools():
+    """Stops every process pool (app shutdown)."""
+    with _pools_lock:
+        pools = list(_pools)
+    for pool in pools:
+        pool.shutdown()
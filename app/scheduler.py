@@ -0,0 +1,210 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict
+
+from app import config
+from app.jobs import QueueFullError
+from app.metrics import collect_timings, record_stage
+from app.pools import ProcessPool
+from app.uploads import SpooledUpload, release
+
+# Formats that rasterize and OCR: CPU-bound and memory-hungry
+HEAVY_TYPES = {
+    "application/pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "image/png",
+    "image/jpeg",
+    "image/tiff",
+}
+
+# Formats whose extractor can fan out to a pool of its own (PDF page ranges).
+# Those documents stay on a thread in the API process, since another process per
+# document would only add a hop; the ones that don't fan out go to the extract pool
+FAN_OUT_TYPES = {"application/pdf"}
+
+# Rough peak-RAM multiplier over the file size while a format is being extracted
+MEMORY_FACTORS = {"heavy": 8, "light": 4}
+
+
+class MemoryBudget:
+    """
+    Counting semaphore over bytes. A reservation waits until it fits;
+    one that is larger than the whole budget is let through alone
+    so it can't block forever.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.reserved = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def reserve(self, cost: int):
+        with self._cond:
+            while self.reserved and self.reserved + cost > self.max_bytes:
+                self._cond.wait()
+            self.reserved += cost
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.reserved -= cost
+                self._cond.notify_all()
+
+
+class BatchScheduler:
+    """
+    Admission control for /api/extract/batch, shared by every batch request.
+    Heavy (OCR) and light (CSV/HTML/XLSX) files run in separate lanes, so cheap
+    formats keep flowing while OCR jobs occupy the CPU. Both lanes draw from one
+    memory budget sized by each file's estimated peak RAM.
+    """
+
+    def __init__(self, heavy_workers: int, light_workers: int, memory_bytes: int):
+        self.budget = MemoryBudget(memory_bytes)
+        self._lanes = {
+            "heavy": ThreadPoolExecutor(max_workers=max(1, heavy_workers), thread_name_prefix="batch-heavy"),
+            "light": ThreadPoolExecutor(max_workers=max(1, light_workers), thread_name_prefix="batch-light"),
+        }
+
+    @staticmethod
+    def classify(mime_type: str) -> str:
+        return "heavy" if mime_type in HEAVY_TYPES else "light"
+
+    def submit(self, kind: str, size: int, fn, *args) -> Future:
+        cost = size * MEMORY_FACTORS[kind]
+
+        def run():
+            with self.budget.reserve(cost):
+                return fn(*args)
+
+        return self._lanes[kind].submit(run)
+
+    def stats(self) -> dict:
+        return {"memory_reserved": self.budget.reserved, "memory_budget": self.budget.max_bytes}
+
+
+batch_scheduler = BatchScheduler(config.BATCH_HEAVY_WORKERS, config.BATCH_LIGHT_WORKERS, config.BATCH_MEMORY_BYTES)
+
+
+class ExtractGate:
+    """
+    Admission control for /api/extract. Each format has its own concurrency
+    limit (few slots for OCR-capable formats, more for cheap ones) and a bounded
+    waiting line; once the line is full new requests are refused with
+    QueueFullError, so a burst sheds load instead of slowing every request down.
+    """
+
+    def __init__(self, heavy_limit: int, light_limit: int, overrides: Dict[str, int], max_waiting: int):
+        self.limits = {"heavy": max(1, heavy_limit), "light": max(1, light_limit)}
+        self.overrides = overrides
+        self.max_waiting = max_waiting
+        self._slots: Dict[str, _FormatSlot] = {}
+        self._loop = None
+
+    def _slot(self, file_type: str, mime_type: str) -> "_FormatSlot":
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # asyncio primitives belong to one loop; a new loop (e.g. a test client) starts clean
+            self._loop, self._slots = loop, {}
+        if file_type not in self._slots:
+            limit = self.overrides.get(file_type) or self.limits[BatchScheduler.classify(mime_type)]
+            self._slots[file_type] = _FormatSlot(limit)
+        return self._slots[file_type]
+
+    @asynccontextmanager
+    async def admit(self, file_type: str, mime_type: str):
+        slot = self._slot(file_type, mime_type)
+        if slot.semaphore.locked() and slot.waiting >= self.max_waiting:
+            raise QueueFullError(f"Too many {file_type} extractions queued, retry later")
+        slot.waiting += 1
+        try:
+            await slot.semaphore.acquire()
+        finally:
+            slot.waiting -= 1
+        slot.running += 1
+        try:
+            yield
+        finally:
+            slot.running -= 1
+            slot.semaphore.release()
+
+    def stats(self) -> dict:
+        return {file_type: {"limit": slot.limit, "running": slot.running, "waiting": slot.waiting}
+                for file_type, slot in self._slots.items()}
+
+
+class _FormatSlot:
+    """One format's semaphore plus the counters behind ExtractGate.stats()."""
+
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.limit = limit
+        self.running = 0
+        self.waiting = 0
+
+
+extract_gate = ExtractGate(config.EXTRACT_HEAVY_CONCURRENCY, config.EXTRACT_LIGHT_CONCURRENCY,
+                           config.EXTRACT_CONCURRENCY, config.EXTRACT_MAX_WAITING)
+
+# Process pool for /api/extract
+_extract_pool = ProcessPool()
+
+
+def extract_in_thread(extractor_class, mime_type, source, filename, limits, columnar, progress_callback=None):
+    """Runs the extractor right here. Returns (units or UnitColumns, truncated, skipped_pages)."""
+    extractor = extractor_class(source, filename)
+    extractor.progress_callback = progress_callback
+    extractor.limits = limits
+    content = extractor.extract_columns() if columnar else extractor.extract()
+    return content, extractor.truncated, extractor.skipped_pages
+
+
+def _extract_in_worker(extractor_class, source_ref, filename, limits):
+    """
+    Runs inside a pool worker. The spool file is mapped again by path rather
+    than pickled, and the result travels back as UnitColumns (a few lists
+    instead of one model per unit), with the worker's stage timings.
+    """
+    source = SpooledUpload(source_ref, owner=False) if isinstance(source_ref, str) else source_ref
+    extractor = None
+    try:
+        with collect_timings() as timings:
+            extractor = extractor_class(source, filename)
+            extractor.limits = limits
+            columns = extractor.extract_columns()
+        return columns, extractor.truncated, extractor.skipped_pages, timings
+    finally:
+        extractor = None
+        try:
+            release(source)
+        except BufferError:
+            # A failed parser's traceback still holds views of the mapping; it goes with them
+            pass
+
+
+def _fans_out(extractor_class, mime_type, source, filename, limits) -> bool:
+    if mime_type not in FAN_OUT_TYPES:
+        return False
+    extractor = extractor_class(source, filename)
+    extractor.limits = limits
+    return extractor.fans_out()
+
+
+def extract_in_pool(extractor_class, mime_type, source, filename, limits, columnar, progress_callback=None):
+    """
+    extract_in_thread, but the parsing happens in the extraction process pool,
+    where it doesn't hold the API process's GIL. PDFs that fan their pages out
+    (see FAN_OUT_TYPES) and EXTRACT_POOL_WORKERS=0 keep the in-thread path.
+    """
+    if config.EXTRACT_POOL_WORKERS <= 0 or _fans_out(extractor_class, mime_type, source, filename, limits):
+        return extract_in_thread(extractor_class, mime_type, source, filename, limits, columnar, progress_callback)
+
+    source_ref = source.path if isinstance(source, SpooledUpload) else source
+    future = _extract_pool.get(config.EXTRACT_POOL_WORKERS).submit(_extract_in_worker, extractor_class, source_ref, filename, limits)
+    columns, truncated, skipped_pages, timings = future.result()
+    for name, seconds in timings.items():
+        record_stage(name, seconds)
+    return (columns if columnar else columns.to_content()), truncated, skipped_pages
@@ -1,6 +1,6 @@
 #
 from pydantic import BaseModel
-from typing import List, Literal, Union, Optional
+from typing import Any, Dict, List, Literal, Union, Optional
 
 class Location(BaseModel):
     """Polymorphic location to handle different file types"""
@@ -14,10 +14,130 @@ class ExtractedUnit(BaseModel):
     text: str
     source: str   
     location: Location
+    # Optional extractor diagnostics (e.g. OCR DPI chosen, skipped blank pages)
+    metadata: Optional[Dict[str, Any]] = None
+
+class UnitColumns:
+    """
+    Compact in-memory storage for many units: one list per field
+    instead of an ExtractedUnit + Location model per unit.
+    """
+    __slots__ = ("text", "source", "location_type", "location_number",
+                 "location_sheet", "location_coordinates", "metadata")
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, [])
+
+    def __len__(self):
+        return len(self.text)
+
+    def append(self, unit: ExtractedUnit):
+        self.text.append(unit.text)
+        self.source.append(unit.source)
+        self.location_type.append(unit.location.type)
+        self.location_number.append(unit.location.number)
+        self.location_sheet.append(unit.location.sheet)
+        self.location_coordinates.append(unit.location.coordinates)
+        self.metadata.append(unit.metadata)
+
+    def extend_rows(self, texts: List[str], numbers: List[int], sheet: str):
+        """Bulk-adds table rows (source and sheet are both the sheet name)."""
+        count = len(texts)
+        self.text.extend(texts)
+        self.source.extend([sheet] * count)
+        self.location_type.extend(["row"] * count)
+        self.location_number.extend(numbers)
+        self.location_sheet.extend([sheet] * count)
+        self.location_coordinates.extend([None] * count)
+        self.metadata.extend([None] * count)
+
+    def to_dict(self) -> Dict[str, Optional[list]]:
+        """Parallel arrays keyed by field; a column that is null for every unit is sent as null."""
+        return {name: (values if any(value is not None for value in values) else None)
+                for name, values in ((name, getattr(self, name)) for name in self.__slots__)}
+
+    @classmethod
+    def from_dict(cls, columns: Dict[str, Optional[list]]) -> "UnitColumns":
+        result = cls()
+        count = len(columns["text"])
+        for name in cls.__slots__:
+            setattr(result, name, columns.get(name) or [None] * count)
+        return result
+
+    @classmethod
+    def from_content(cls, content: List[Dict[str, Any]]) -> "UnitColumns":
+        """Columns from units serialized with model_dump() (e.g. cached results)."""
+        result = cls()
+        for unit in content:
+            location = unit["location"]
+            result.text.append(unit["text"])
+            result.source.append(unit["source"])
+            result.location_type.append(location["type"])
+            result.location_number.append(location.get("number"))
+            result.location_sheet.append(location.get("sheet"))
+            result.location_coordinates.append(location.get("coordinates"))
+            result.metadata.append(unit.get("metadata"))
+        return result
+
+    def to_content(self) -> List[Dict[str, Any]]:
+        """The per-unit dict form DocumentResponse.content accepts."""
+        return [
+            {"text": text, "source": source, "metadata": metadata,
+             "location": {"type": type_, "number": number, "sheet": sheet, "coordinates": coordinates}}
+            for text, source, type_, number, sheet, coordinates, metadata in zip(
+                self.text, self.source, self.location_type, self.location_number,
+                self.location_sheet, self.location_coordinates, self.metadata)
+        ]
 
 class DocumentResponse(BaseModel):
     """The final standardized output sent to the UI"""
     filename: str
     file_type: str
     processing_time_ms: float
-    content: List[ExtractedUnit]
\ No newline at end of file
+    content: List[ExtractedUnit]
+    # Milliseconds per pipeline stage; only filled when asked for (?timings=true)
+    timings: Optional[Dict[str, float]] = None
+    # True when max_units / max_time_ms stopped the extraction early
+    truncated: bool = False
+    # Pages left out on purpose (blank scanned pages), e.g. to check what skipping them saved
+    skipped_pages: Optional[List[int]] = None
+
+class ColumnarDocumentResponse(BaseModel):
+    """Compact variant of DocumentResponse (?format=columnar): UnitColumns.to_dict() instead of content"""
+    filename: str
+    file_type: str
+    processing_time_ms: float
+    format: Literal["columnar"] = "columnar"
+    count: int
+    columns: Dict[str, Optional[List[Any]]]
+    timings: Optional[Dict[str, float]] = None
+    truncated: bool = False
+    skipped_pages: Optional[List[int]] = None
+
+class JobStatus(BaseModel):
+    """Status of a background extraction job"""
+    job_id: str
+    status: Literal["queued", "running", "done", "failed", "expired"]
+    filename: str
+    priority: str
+    pages_done: int = 0
+    pages_total: Optional[int] = None
+    error: Optional[str] = None
+
+
+
+class BatchItem(BaseModel):
+    """Outcome of one file inside a batch"""
+    filename: str
+    status: Literal["ok", "error"]
+    queued_ms: float
+    processing_time_ms: float
+    result: Optional[DocumentResponse] = None
+    error: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    """Aggregated output of /api/extract/batch"""
+    total_time_ms: float
+    items: List[BatchItem]
@@ -0,0 +1,158 @@
+import io
+import mmap
+import os
+import tempfile
+import zipfile
+from typing import List, Tuple, Union
+
+from app import config
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload grows past the configured MAX_UPLOAD_BYTES."""
+
+
+class SpooledUpload:
+    """
+    An upload copied to a temp file on disk and memory-mapped read-only.
+    Extractors read it through the mmap (or by re-opening the path)
+    instead of holding several in-RAM copies of the whole file.
+    """
+
+    def __init__(self, path: str, owner: bool = True):
+        self.path = path
+        # Only the owner deletes the file; other processes just map it
+        self.owner = owner
+        self.size = os.path.getsize(path)
+        self._file = open(path, "rb")
+        # mmap can't map empty files
+        self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+
+    def __len__(self):
+        return self.size
+
+    def open(self):
+        """Returns a fresh binary file object positioned at the start."""
+        return open(self.path, "rb")
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self._file.close()
+        if not self.owner:
+            return
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+Source = Union[bytes, SpooledUpload]
+
+
+def spool_upload(stream, max_bytes: int = None) -> SpooledUpload:
+    """
+    Copies a file-like upload to disk in fixed-size chunks, aborting as soon
+    as more than `max_bytes` have been read.
+    """
+    max_bytes = config.MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    fd, path = tempfile.mkstemp(prefix="upload_", dir=config.UPLOAD_SPOOL_DIR or None)
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if max_bytes and written > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds the {max_bytes} byte limit")
+                out.write(chunk)
+        return SpooledUpload(path)
+    except BaseException:
+        os.unlink(path)
+        raise
+
+
+async def spool_upload_async(stream, max_bytes: int = None) -> SpooledUpload:
+    """spool_upload for async streams (e.g. Starlette's UploadFile): each chunk is awaited."""
+    max_bytes = config.MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    fd, path = tempfile.mkstemp(prefix="upload_", dir=config.UPLOAD_SPOOL_DIR or None)
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if max_bytes and written > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds the {max_bytes} byte limit")
+                out.write(chunk)
+        return SpooledUpload(path)
+    except BaseException:
+        os.unlink(path)
+        raise
+
+
+def as_buffer(source: Source):
+    """Zero-copy bytes-like view of a source (bytes or mmap)."""
+    return source.buffer if isinstance(source, SpooledUpload) else source
+
+
+def open_source(source: Source):
+    """Binary file object over a source, for parsers that want a stream."""
+    return source.open() if isinstance(source, SpooledUpload) else io.BytesIO(source)
+
+
+def read_header(source: Source, size: int = None) -> bytes:
+    """First bytes of a source; enough for libmagic to sniff the MIME type."""
+    size = config.MIME_SNIFF_BYTES if size is None else size
+    return bytes(as_buffer(source)[:size])
+
+
+def release(source: Source):
+    """Deletes the spool file behind a source (no-op for plain bytes)."""
+    if isinstance(source, SpooledUpload):
+        source.close()
+
+
+def expand_zip(source: Source, max_files: int, max_bytes: int = None,
+               total_bytes: int = None) -> List[Tuple[str, SpooledUpload]]:
+    """
+    Spools every file of a zip archive to its own SpooledUpload.
+    Member sizes are enforced while decompressing (not trusted from the
+    zip headers), so a zip bomb stops at `max_bytes` per member and at
+    `total_bytes` for all members together.
+    """
+    members = []
+    spooled_bytes = 0
+    try:
+        with open_source(source) as stream, zipfile.ZipFile(stream) as archive:
+            for info in archive.infolist():
+                name = os.path.basename(info.filename)
+                # Skip folders and macOS resource forks
+                if info.is_dir() or not name or info.filename.startswith("__MACOSX/"):
+                    continue
+                if len(members) >= max_files:
+                    raise ValueError(f"Archive has more than {max_files} files")
+                limit = max_bytes
+                if total_bytes:
+                    remaining = max(1, total_bytes - spooled_bytes)
+                    limit = min(limit, remaining) if limit else remaining
+                with archive.open(info) as member:
+                    try:
+                        spooled = spool_upload(member, limit)
+                    except UploadTooLargeError:
+                        if limit == max_bytes:
+                            raise
+                        raise UploadTooLargeError(f"Archive expands past the {total_bytes} byte limit")
+                members.append((name, spooled))
+                spooled_bytes += len(spooled)
+    except BaseException:
+        for _, spooled in members:
+            spooled.close()
+        raise
+    return members
@@ -2,22 +2,256 @@ import cv2
 import numpy as np
 from PIL import Image
 import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from app import config
+from app.metrics import stage
+
+# Steps OCR_PREPROCESS may list; at most one of otsu / adaptive
+PREPROCESS_STEPS = ("downscale", "deskew", "otsu", "adaptive")
+
+# Stated resolutions below this are screen defaults (72, 96) written by cameras and editors, not scan DPIs
+MIN_TRUSTED_DPI = 150
+
+# Bytes of an encoded image that are enough to read its size and DPI
+_HEADER_BYTES = 256 * 1024
+
+# Decode flags that let libjpeg shrink while decoding (others decode, then resize)
+_REDUCED_DECODES = ((8, cv2.IMREAD_REDUCED_GRAYSCALE_8), (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+                    (2, cv2.IMREAD_REDUCED_GRAYSCALE_2))
+
+
+class PreprocessPipeline:
+    """
+    Image -> grayscale -> [downscale] -> [deskew] -> [otsu | adaptive] -> PIL image for Tesseract.
+    Grayscale files are decoded as one channel (not expanded to colour and
+    back), colour ones are resized only after conversion, and oversized
+    JPEGs are shrunk by the decoder itself.
+    downscale: down to target_dpi when the image states a higher DPI; images
+    without a usable DPI are capped at a letter page at target_dpi (11in on
+    the long side). Large-format scans that state their DPI keep their size
+    (ImageExtractor reads them in bands).
+    Without a threshold step the grayscale image goes to Tesseract as is.
+    """
+
+    def __init__(self, steps=("downscale", "otsu"), target_dpi: int = 300):
+        unknown = set(steps) - set(PREPROCESS_STEPS)
+        if unknown:
+            raise ValueError(f"Unknown preprocessing steps: {', '.join(sorted(unknown))}")
+        if "otsu" in steps and "adaptive" in steps:
+            raise ValueError("Pick one threshold step: otsu or adaptive")
+        self.steps = tuple(steps)
+        self.target_dpi = target_dpi
+        self.max_side = target_dpi * 11
+
+    def scale_for(self, width: int, height: int, dpi: Optional[float] = None) -> float:
+        """Resize factor (<= 1) the downscale step applies to a width x height image."""
+        if "downscale" not in self.steps:
+            return 1.0
+        if dpi and dpi >= MIN_TRUSTED_DPI:
+            return min(1.0, self.target_dpi / dpi)
+        longest = max(width, height)
+        return min(1.0, self.max_side / longest) if longest else 1.0
+
+    def decode(self, data, direct_gray: bool = False) -> np.ndarray:
+        """
+        Encoded image (bytes, mmap, ...) -> downscaled grayscale array.
+        direct_gray has the codec produce one channel itself, so no colour copy
+        is ever held (for huge images; the grays differ from cvtColor by rounding).
+        """
+        width, height, dpi = read_image_header(data)
+        scale = self.scale_for(width, height, dpi) if width else 1.0
+        # ANYCOLOR keeps grayscale files single-channel (and still applies EXIF orientation)
+        flag, reduction = cv2.IMREAD_GRAYSCALE if direct_gray else cv2.IMREAD_ANYCOLOR, 1
+        for factor, reduced_flag in _REDUCED_DECODES:
+            if scale <= 1 / factor:
+                flag, reduction = reduced_flag, factor
+                break
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+        if img is None:
+            raise ValueError("Unreadable image")
+        return _to_gray(img, "BGR", scale * reduction)
+
+    def to_gray(self, img: np.ndarray, channel_order: str = "RGB", dpi: Optional[float] = None) -> np.ndarray:
+        """Decoded array (RGB/BGR, with or without alpha, or grayscale) -> downscaled grayscale."""
+        return _to_gray(img, channel_order, self.scale_for(img.shape[1], img.shape[0], dpi))
+
+    def finish(self, gray: np.ndarray) -> Image.Image:
+        """The steps after grayscale/downscale: deskew and threshold."""
+        if "deskew" in self.steps:
+            gray = _deskew(gray)
+        if "otsu" in self.steps:
+            # Global threshold: removes shadows and makes text strictly black/white
+            _, gray = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        elif "adaptive" in self.steps:
+            # Local threshold: copes with uneven lighting (phone photos, folded pages)
+            gray = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15)
+        return Image.fromarray(gray)
+
+    def from_bytes(self, data) -> Image.Image:
+        return self.finish(self.decode(data))
+
+    def from_array(self, img: np.ndarray, channel_order: str = "RGB", dpi: Optional[float] = None) -> Image.Image:
+        return self.finish(self.to_gray(img, channel_order, dpi))
+
+
+def read_image_header(data):
+    """(width, height, dpi) from the image header without decoding pixels; Nones if unknown."""
+    try:
+        with Image.open(io.BytesIO(bytes(memoryview(data)[:_HEADER_BYTES]))) as im:
+            dpi = im.info.get("dpi")
+            return im.width, im.height, float(max(dpi)) if dpi else None
+    except Exception:
+        return None, None, None
+
+
+def _to_gray(img: np.ndarray, channel_order: str, scale: float) -> np.ndarray:
+    # Convert first: resizing one channel is much cheaper than resizing three
+    if img.ndim == 3 and img.shape[2] == 4:
+        img = cv2.cvtColor(img, cv2.COLOR_RGBA2GRAY if channel_order == "RGB" else cv2.COLOR_BGRA2GRAY)
+    elif img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY if channel_order == "RGB" else cv2.COLOR_BGR2GRAY)
+    return _resize(img, scale)
+
+
+def _resize(img: np.ndarray, scale: float) -> np.ndarray:
+    if scale >= 1.0:
+        return img
+    size = (max(1, round(img.shape[1] * scale)), max(1, round(img.shape[0] * scale)))
+    # INTER_AREA is the better filter for big reductions but ~8x slower at fractional ones
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA if scale <= 0.5 else cv2.INTER_LINEAR)
+
+
+def _deskew(gray: np.ndarray, max_angle: float = 15.0) -> np.ndarray:
+    """
+    Straightens a page rotated by a few degrees: the minimum-area rectangle
+    around all ink gives the skew. Larger angles are left alone, since they
+    are more likely a tilted photo or table than a skewed scan.
+    """
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    points = cv2.findNonZero(ink)
+    if points is None or len(points) < 100:
+        return gray
+    angle = cv2.minAreaRect(points)[-1]
+    # OpenCV reports (0, 90] (older versions [-90, 0)); fold it into [-45, 45]
+    if angle > 45:
+        angle -= 90
+    elif angle < -45:
+        angle += 90
+    if abs(angle) < 0.3 or abs(angle) > max_angle:
+        return gray
+    h, w = gray.shape
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(gray, matrix, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+pipeline = PreprocessPipeline(config.OCR_PREPROCESS, config.OCR_TARGET_DPI)
+
+_batch_pool: Optional[ThreadPoolExecutor] = None
+_batch_pool_lock = threading.Lock()
+
+
+def _map(fn, items: list) -> list:
+    """
+    map() over a shared thread pool; OpenCV releases the GIL, so images really
+    run side by side. An item that fails comes back as None instead of failing the batch.
+    """
+    global _batch_pool
+
+    def safe(item):
+        try:
+            return fn(item)
+        except Exception as e:
+            print(f"Preprocess Error: {e}")
+            return None
+
+    if len(items) < 2 or config.OCR_WORKERS <= 1:
+        return [safe(item) for item in items]
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            _batch_pool = ThreadPoolExecutor(max_workers=config.OCR_WORKERS, thread_name_prefix="preprocess")
+    return list(_batch_pool.map(safe, items))
+
 
 def preprocess_image_for_ocr(image_bytes: bytes) -> Image.Image:
     """
-    Converts raw bytes -> Grayscale -> Thresholded Image
+    Encoded image bytes -> image ready for Tesseract (see PreprocessPipeline).
     Drastically improves Tesseract accuracy.
     """
-    # 1. Convert bytes to numpy array
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    with stage("preprocess"):
+        return pipeline.from_bytes(image_bytes)
+
+
+def preprocess_array_for_ocr(img: np.ndarray, channel_order: str = "RGB", dpi: Optional[float] = None) -> Image.Image:
+    """
+    Array-input variant of preprocess_image_for_ocr for images that are
+    already decoded (PDF rasterizer output, raw PDF image streams),
+    so they don't need a PNG encode/decode round trip.
+    channel_order: "RGB" (PIL / PDF) or "BGR" (OpenCV). Ignored for 2-D grayscale.
+    dpi: the resolution the array was rendered at, when known.
+    """
+    with stage("preprocess"):
+        return pipeline.from_array(img, channel_order, dpi)
+
+
+def preprocess_images_for_ocr(images: List[bytes]) -> List[Image.Image]:
+    """Batch preprocess_image_for_ocr: every image of a document in one call (None for unreadable ones)."""
+    with stage("preprocess"):
+        return _map(pipeline.from_bytes, images)
+
+
+def preprocess_arrays_for_ocr(arrays: List[Tuple[np.ndarray, str]], dpi: Optional[float] = None) -> List[Image.Image]:
+    """Batch preprocess_array_for_ocr over (array, channel_order) pairs (None for failures)."""
+    with stage("preprocess"):
+        return _map(lambda item: pipeline.from_array(item[0], item[1], dpi), arrays)
+
+
+def pil_to_array(im: Image.Image) -> np.ndarray:
+    """PIL image -> uint8 array (RGB or grayscale) without an encode step."""
+    if im.mode not in ("RGB", "L"):
+        im = im.convert("RGB")
+    return np.asarray(im)
+
+
+def analyze_scanned_page(gray: np.ndarray, dpi: int, blank_ink_ratio: float) -> dict:
+    """
+    Cheap look at a low-DPI grayscale render of a page before the real OCR pass.
+    Returns:
+        blank: True when (almost) nothing is printed on the page
+        ink_ratio: fraction of pixels clearly darker than the paper
+        text_height_pt: median glyph height in points (None if it can't be estimated)
+    """
+    # Ignore a 5% border: scanner edges and punch holes aren't content
+    h, w = gray.shape
+    my, mx = int(h * 0.05), int(w * 0.05)
+    inner = gray[my:h - my, mx:w - mx] if h > 20 and w > 20 else gray
+
+    # "Ink" = clearly darker than the paper, whatever the paper's shade is
+    background = float(np.median(inner))
+    ink = inner < min(background - 60, 200)
+    ink_ratio = float(ink.mean()) if ink.size else 0.0
+    if ink_ratio < blank_ink_ratio:
+        return {"blank": True, "ink_ratio": ink_ratio, "text_height_pt": None}
 
-    # 2. Grayscale
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    # Glyph-sized connected components give the typical text height
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink.astype(np.uint8), connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    glyphs = heights[(areas >= 3) & (heights >= 2) & (heights < inner.shape[0] * 0.1)]
+    text_height_pt = float(np.median(glyphs)) * 72.0 / dpi if len(glyphs) >= 10 else None
 
-    # 3. Threshold (Binarization) using Otsu's method
-    # This removes shadows and makes text strictly black/white
-    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return {"blank": False, "ink_ratio": ink_ratio, "text_height_pt": text_height_pt}
 
-    # 4. Convert back to PIL Image for Tesseract
-    return Image.fromarray(thresh)
\ No newline at end of file
+
+def choose_ocr_dpi(text_height_pt, target_px: int, min_dpi: int, max_dpi: int) -> int:
+    """
+    Lowest render DPI that still gives glyphs about `target_px` pixels of height
+    (Tesseract's sweet spot), rounded up to a multiple of 25 and clamped.
+    Unknown text size -> max_dpi, the safe choice.
+    """
+    if not text_height_pt:
+        return max_dpi
+    dpi = target_px * 72.0 / text_height_pt
+    dpi = int(-(-dpi // 25) * 25)
+    return max(min_dpi, min(max_dpi, dpi))
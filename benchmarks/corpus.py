@@ -0,0 +1,167 @@
+"""
+Deterministic synthetic documents for the benchmarks.
+
+Every generator takes a size and a seed and returns (filename, bytes), so the
+same arguments always produce the same file and runs can be compared.
+Only the project's own dependencies are used (no reportlab): native PDFs are
+written by hand, scanned PDFs and images come from Pillow.
+"""
+import io
+import random
+
+import numpy as np
+import pandas as pd
+from PIL import Image, ImageDraw, ImageFont
+
+WORDS = (
+    "invoice total amount account balance payment order customer shipping "
+    "address quantity price tax discount report quarter revenue growth "
+    "summary analysis contract service period annual statement reference"
+).split()
+
+
+def _sentence(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def native_pdf(pages: int, seed: int = 0, lines_per_page: int = 45):
+    """Text-layer PDF (Helvetica, US Letter): the pdfplumber fast path."""
+    rng = random.Random(seed)
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    kids = []
+    for page in range(pages):
+        page_id, content_id = 4 + page * 2, 5 + page * 2
+        lines = [_pdf_escape(_sentence(rng, 10)) for _ in range(lines_per_page)]
+        stream = "BT /F1 10 Tf 14 TL 56 740 Td " + " ".join(f"({line}) Tj T*" for line in lines) + " ET"
+        stream = stream.encode("latin-1")
+        objects[content_id] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        objects[page_id] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        kids.append(b"%d 0 R" % page_id)
+    objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), pages)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = out.tell()
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (obj_id, objects[obj_id]))
+    xref = out.tell()
+    size = max(objects) + 1
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+    for obj_id in range(1, size):
+        out.write(b"%010d 00000 n \n" % offsets[obj_id])
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref))
+    return f"native_{pages}p.pdf", out.getvalue()
+
+
+def _text_image(rng: random.Random, width: int, height: int, lines: int, font_size: int) -> Image.Image:
+    im = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(im)
+    font = ImageFont.load_default(size=font_size)
+    step = font_size * 2
+    for line in range(lines):
+        draw.text((font_size * 2, font_size * 2 + line * step), _sentence(rng, 6), fill="black", font=font)
+    return im
+
+
+def scanned_pdf(pages: int, seed: int = 0):
+    """Image-only PDF (100 DPI page scans): the OCR path."""
+    rng = random.Random(seed)
+    images = [_text_image(rng, 850, 1100, 20, 22) for _ in range(pages)]
+    out = io.BytesIO()
+    images[0].save(out, format="PDF", save_all=True, append_images=images[1:], resolution=100)
+    return f"scanned_{pages}p.pdf", out.getvalue()
+
+
+def docx_file(paragraphs: int, tables: int, seed: int = 0, table_rows: int = 20):
+    import docx
+
+    rng = random.Random(seed)
+    doc = docx.Document()
+    per_table = max(1, paragraphs // (tables + 1))
+    for i in range(paragraphs):
+        doc.add_paragraph(_sentence(rng, 20))
+        if tables and i % per_table == per_table - 1 and len(doc.tables) < tables:
+            table = doc.add_table(rows=table_rows, cols=4)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = rng.choice(WORDS)
+    out = io.BytesIO()
+    doc.save(out)
+    return f"doc_{paragraphs}para_{tables}tbl.docx", out.getvalue()
+
+
+def _frame(rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "id": np.arange(rows),
+        "customer": rng.choice(WORDS, size=rows),
+        "quantity": rng.integers(1, 100, size=rows),
+        "price": rng.random(rows).round(2) * 1000,
+        "note": rng.choice(WORDS, size=rows),
+    })
+
+
+def csv_file(rows: int, seed: int = 0):
+    return f"table_{rows}r.csv", _frame(rows, seed).to_csv(index=False).encode("utf-8")
+
+
+def xlsx_file(rows: int, seed: int = 0):
+    out = io.BytesIO()
+    _frame(rows, seed).to_excel(out, index=False, engine="openpyxl")
+    return f"table_{rows}r.xlsx", out.getvalue()
+
+
+def html_file(paragraphs: int, seed: int = 0):
+    """Article-like page with the usual script/style noise around the text."""
+    rng = random.Random(seed)
+    parts = ["<!DOCTYPE html><html><head><meta charset='utf-8'><title>Report</title>",
+             "<style>" + "p { margin: 0 }" * 50 + "</style>",
+             "<script>" + "var x = 1;" * 200 + "</script></head><body>"]
+    for i in range(paragraphs):
+        if i % 20 == 0:
+            parts.append(f"<h2>Section {i // 20}</h2>")
+        parts.append(f"<div class='row'><p>{_sentence(rng, 25)}</p></div>")
+    parts.append("</body></html>")
+    return f"page_{paragraphs}para.html", "".join(parts).encode("utf-8")
+
+
+def png_image(width: int, height: int, seed: int = 0):
+    rng = random.Random(seed)
+    im = _text_image(rng, width, height, max(1, height // 48) - 1, 20)
+    out = io.BytesIO()
+    im.save(out, format="PNG")
+    return f"image_{width}x{height}.png", out.getvalue()
+
+
+# name -> (generator, kwargs per scale); sizes grow roughly 5x per step
+CORPUS = {
+    "pdf_native": (native_pdf, {"small": {"pages": 10}, "medium": {"pages": 50}, "large": {"pages": 250}}),
+    "pdf_scanned": (scanned_pdf, {"small": {"pages": 2}, "medium": {"pages": 10}, "large": {"pages": 50}}),
+    "docx": (docx_file, {"small": {"paragraphs": 200, "tables": 2}, "medium": {"paragraphs": 1000, "tables": 10},
+                         "large": {"paragraphs": 5000, "tables": 50}}),
+    "csv": (csv_file, {"small": {"rows": 10_000}, "medium": {"rows": 50_000}, "large": {"rows": 250_000}}),
+    "xlsx": (xlsx_file, {"small": {"rows": 2_000}, "medium": {"rows": 10_000}, "large": {"rows": 50_000}}),
+    "html": (html_file, {"small": {"paragraphs": 500}, "medium": {"paragraphs": 2_500}, "large": {"paragraphs": 12_500}}),
+    "image": (png_image, {"small": {"width": 800, "height": 600}, "medium": {"width": 1700, "height": 2200},
+                          "large": {"width": 3400, "height": 4400}}),
+}
+
+# Cases that need a working Tesseract
+OCR_CASES = {"pdf_scanned", "image"}
+
+
+def generate(name: str, scale: str, seed: int = 0):
+    """Returns (filename, bytes) for one corpus entry at the given scale."""
+    generator, sizes = CORPUS[name]
+    return generator(seed=seed, **sizes[scale])
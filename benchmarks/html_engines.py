@@ -0,0 +1,45 @@
+"""
+Compares the HTML engines on generated pages of growing size.
+
+    python -m benchmarks.html_engines [--scales small,medium,large] [--repeat 3]
+
+"bs4" is the original approach (BeautifulSoup tree, decompose, get_text).
+"streaming" is the incremental tokenizer in app/extractors/web.py.
+Both must produce the same lines; a mismatch is reported.
+"""
+import argparse
+import time
+
+from app.extractors.web import HTMLExtractor
+from benchmarks import corpus
+
+
+def best_of(repeat, engine, data, filename):
+    """Fastest of `repeat` runs, plus the extracted lines."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        lines = [unit.text for unit in HTMLExtractor(data, filename, engine=engine).extract()]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="small,medium,large")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for scale in args.scales.split(","):
+        filename, data = corpus.generate("html", scale)
+        size_mb = len(data) / (1024 * 1024)
+        reference, expected = best_of(args.repeat, "bs4", data, filename)
+        streaming, lines = best_of(args.repeat, "streaming", data, filename)
+        print(f"{scale:<7} {size_mb:6.2f} MB  bs4 {reference:7.3f}s ({size_mb / reference:6.2f} MB/s)  "
+              f"streaming {streaming:7.3f}s ({size_mb / streaming:6.2f} MB/s)  "
+              f"x{reference / streaming:4.1f}  {'same output' if lines == expected else 'OUTPUT DIFFERS'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Compares OCR engines on the same set of small images.
+
+    python -m benchmarks.ocr_engines [--images 40] [--workers 4]
+
+"per-call" is the original approach (one pytesseract subprocess per image,
+sequential). The other rows use the engines in app/ocr.py. tesserocr is
+skipped when it isn't installed.
+"""
+import argparse
+import time
+
+from PIL import Image, ImageDraw
+
+from app import ocr
+
+
+def make_images(count):
+    """Small synthetic 'logo/label' crops, the case where start-up cost dominates."""
+    images = []
+    for i in range(count):
+        im = Image.new("L", (320, 60), color=255)
+        ImageDraw.Draw(im).text((10, 20), f"Invoice line {i:03d} total 12.50", fill=0)
+        images.append(im)
+    return images
+
+
+def run(label, fn, images):
+    start = time.perf_counter()
+    texts = fn(images)
+    elapsed = time.perf_counter() - start
+    recognized = sum(1 for text in texts if text.strip())
+    print(f"{label:<22} {elapsed:8.2f}s  {len(images) / elapsed:8.1f} img/s  ({recognized}/{len(images)} non-empty)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    images = make_images(args.images)
+    run("per-call (sequential)", lambda ims: [ocr.pytesseract.image_to_string(im) for im in ims], images)
+    run("pytesseract batch", ocr.PytesseractEngine(args.workers).image_to_string_batch, images)
+
+    if ocr.tesserocr is None:
+        print("tesserocr pool          skipped (pip install tesserocr)")
+        return
+    engine = ocr.TesserocrPoolEngine(args.workers)
+    # The first batch pays the per-worker model load; the second shows the warm pool
+    run("tesserocr pool (cold)", engine.image_to_string_batch, images)
+    run("tesserocr pool (warm)", engine.image_to_string_batch, images)
+
+
+if __name__ == "__main__":
+    main()
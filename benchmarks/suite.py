@@ -0,0 +1,281 @@
+"""
+Benchmarks every extractor, and /api/extract under concurrent load, on synthetic corpora.
+
+    python -m benchmarks.suite [--scale small|medium|large] [--cases csv,pdf_native]
+                               [--iterations 5] [--load-requests 40] [--concurrency 8]
+                               [--output results.json] [--compare baseline.json]
+
+For each case it reports throughput (documents/s and MB/s), p50/p99 latency and
+peak RSS. Every extractor case runs in a fresh process, so peak RSS is the case's
+own high-water mark (PDF pool workers are separate processes and are not counted).
+The endpoint cases start uvicorn with the result cache disabled. --url targets
+an already running server instead.
+
+Results are written as JSON. --compare prints the change against an earlier file.
+OCR cases (scanned PDF, image) are skipped when Tesseract is not installed.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+from benchmarks import corpus
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Content types the uploads are sent with in the endpoint cases
+CONTENT_TYPES = {
+    "pdf_native": "application/pdf",
+    "pdf_scanned": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "html": "text/html",
+    "image": "image/png",
+}
+
+
+def _make_extractor(name, data, filename):
+    from app.extractors.documents import PDFExtractor, WordExtractor
+    from app.extractors.images import ImageExtractor
+    from app.extractors.tables import TableExtractor
+    from app.extractors.web import HTMLExtractor
+
+    if name.startswith("pdf"):
+        return PDFExtractor(data, filename)
+    if name == "docx":
+        return WordExtractor(data, filename)
+    if name in ("csv", "xlsx"):
+        return TableExtractor(data, filename, is_csv=name == "csv")
+    if name == "html":
+        return HTMLExtractor(data, filename)
+    return ImageExtractor(data, filename)
+
+
+def _peak_rss_mb(rusage_who=resource.RUSAGE_SELF):
+    peak = resource.getrusage(rusage_who).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _summarize(latencies, total_bytes, wall_seconds):
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "runs": len(latencies),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 2),
+        "mean_ms": round(float(latencies_ms.mean()), 2),
+        "docs_per_s": round(len(latencies) / wall_seconds, 3),
+        "mb_per_s": round(total_bytes / wall_seconds / (1024 * 1024), 3),
+    }
+
+
+def _measure_extractor(name, scale, seed, iterations, warmup):
+    """Runs in a fresh process: generate the file, warm up, then time `iterations` extractions."""
+    from app.ocr import ocr_cache
+
+    filename, data = corpus.generate(name, scale, seed)
+    for _ in range(warmup):
+        _make_extractor(name, data, filename).extract()
+
+    latencies = []
+    units = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        # Every iteration must OCR for real, not hit the dedup cache of the previous one
+        ocr_cache.clear()
+        run_start = time.perf_counter()
+        units = len(_make_extractor(name, data, filename).extract())
+        latencies.append(time.perf_counter() - run_start)
+    wall = time.perf_counter() - start
+
+    return {
+        "kind": "extractor", "case": name, "scale": scale, "file": filename,
+        "input_bytes": len(data), "units": units,
+        **_summarize(latencies, len(data) * iterations, wall),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _server_peak_rss_mb(pid):
+    """VmHWM of the server process (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def _start_server():
+    port = _free_port()
+    env = dict(os.environ, CACHE_ENABLED="0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    import httpx
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(url + "/", timeout=1)
+            return server, url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start within 30s")
+
+
+def _measure_endpoint(url, name, scale, seed, requests, concurrency, server_pid=None):
+    import httpx
+
+    filename, data = corpus.generate(name, scale, seed)
+    files = {"file": (filename, data, CONTENT_TYPES[name])}
+
+    with httpx.Client(base_url=url, timeout=600) as client:
+        client.post("/api/extract", files=files)  # warm-up
+
+        def one_request(_):
+            start = time.perf_counter()
+            response = client.post("/api/extract", files=files)
+            return time.perf_counter() - start, response.status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(one_request, range(requests)))
+        wall = time.perf_counter() - start
+
+    latencies = [latency for latency, _ in outcomes]
+    return {
+        "kind": "endpoint", "case": name, "scale": scale, "file": filename,
+        "input_bytes": len(data), "concurrency": concurrency,
+        "errors": sum(1 for _, status in outcomes if status != 200),
+        **_summarize(latencies, len(data) * requests, wall),
+        "peak_rss_mb": _server_peak_rss_mb(server_pid) if server_pid else None,
+    }
+
+
+def _tesseract_available():
+    import pytesseract
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current):
+    """Prints p50 / throughput changes for the cases present in both result files."""
+    key = lambda row: (row["kind"], row["case"], row["scale"])
+    before = {key(row): row for row in previous["results"]}
+    print(f"\n{'case':<32} {'p50 ms':>18} {'change':>8} {'docs/s':>18} {'change':>8}")
+    for row in current["results"]:
+        old = before.get(key(row))
+        if old is None:
+            continue
+        p50_change = (row["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100 if old["p50_ms"] else 0.0
+        rate_change = (row["docs_per_s"] - old["docs_per_s"]) / old["docs_per_s"] * 100 if old["docs_per_s"] else 0.0
+        label = "/".join(key(row))
+        print(f"{label:<32} {old['p50_ms']:>8.1f} -> {row['p50_ms']:<8.1f}{p50_change:>+7.1f}% "
+              f"{old['docs_per_s']:>8.2f} -> {row['docs_per_s']:<8.2f}{rate_change:>+7.1f}%")
+
+
+def _print_row(row):
+    print(f"{row['kind']:<9} {row['case']:<12} {row['scale']:<7} {row['input_bytes'] / 1024:>9.0f} KiB "
+          f"p50 {row['p50_ms']:>9.1f} ms  p99 {row['p99_ms']:>9.1f} ms  "
+          f"{row['docs_per_s']:>8.2f} docs/s  {row['mb_per_s']:>7.2f} MB/s  "
+          f"peak RSS {row['peak_rss_mb']} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=["small", "medium", "large"], default="small")
+    parser.add_argument("--cases", default=",".join(corpus.CORPUS), help="comma-separated subset of cases")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--load-requests", type=int, default=40, help="requests per endpoint case (0 skips them)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--url", help="benchmark a running server instead of starting one")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    args = parser.parse_args()
+
+    cases = [name.strip() for name in args.cases.split(",") if name.strip()]
+    unknown = set(cases) - set(corpus.CORPUS)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+    if not _tesseract_available():
+        skipped = [name for name in cases if name in corpus.OCR_CASES]
+        if skipped:
+            print(f"Tesseract not found, skipping {', '.join(skipped)}")
+        cases = [name for name in cases if name not in corpus.OCR_CASES]
+
+    results = []
+    for name in cases:
+        # A fresh process per case keeps peak RSS (and warm caches) from leaking between cases
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as isolated:
+            row = isolated.submit(_measure_extractor, name, args.scale, args.seed, args.iterations, args.warmup).result()
+        _print_row(row)
+        results.append(row)
+
+    if args.load_requests > 0 and cases:
+        server, url = (None, args.url) if args.url else _start_server()
+        try:
+            for name in cases:
+                row = _measure_endpoint(url, name, args.scale, args.seed, args.load_requests,
+                                        args.concurrency, server.pid if server else None)
+                _print_row(row)
+                results.append(row)
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as out:
+        json.dump(report, out, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as previous:
+            compare(json.load(previous), report)
+
+
+if __name__ == "__main__":
+    main()
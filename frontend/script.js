@@ -144,7 +144,14 @@ function setupEventListeners() {
         resultsArea.style.display = 'block'; 
         resultsList.innerHTML = ''; 
 
-        for (let i = 0; i < currentFiles.length; i++) {
+        // Several files: one batch request, the server schedules them and streams results back
+        let handled = false;
+        if (currentFiles.length > 1) {
+            handled = await extractBatch(`${baseUrl}/api/extract/batch?stream=ndjson`);
+        }
+
+        // Single file (or an older server without the batch endpoint): sequential queue
+        for (let i = 0; !handled && i < currentFiles.length; i++) {
             const file = currentFiles[i];
             btnContent.innerHTML = `<i class="fa-solid fa-spinner fa-spin"></i> Processing ${i + 1}/${currentFiles.length}...`;
             
@@ -179,6 +186,57 @@ function setupEventListeners() {
     });
 }
 
+// --- BATCH UPLOAD ---
+// Sends every file in one request and renders each NDJSON item as it arrives.
+// Returns false if the server has no batch endpoint, so the caller can fall back.
+async function extractBatch(batchEndpoint) {
+    const formData = new FormData();
+    currentFiles.forEach(file => formData.append('files', file));
+
+    let response;
+    try {
+        response = await fetch(batchEndpoint, { method: 'POST', body: formData });
+    } catch (error) {
+        return false;
+    }
+    if (response.status === 404 || response.status === 405) return false;
+    if (!response.ok) {
+        const err = await response.json().catch(() => ({}));
+        const error = new Error(JSON.stringify({ status: response.status, msg: err.detail || 'Server Error' }));
+        currentFiles.forEach(file => renderErrorCard(file.name, error));
+        return true;
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    let done = 0;
+
+    while (true) {
+        const { value, done: finished } = await reader.read();
+        if (finished) break;
+        buffered += decoder.decode(value, { stream: true });
+
+        const lines = buffered.split('\n');
+        buffered = lines.pop();
+        for (const line of lines) {
+            if (!line.trim()) continue;
+            const record = JSON.parse(line);
+            if (record.type !== 'item') continue;
+
+            done++;
+            btnContent.innerHTML = `<i class="fa-solid fa-spinner fa-spin"></i> Processing ${done}/${currentFiles.length}...`;
+            if (record.status === 'ok') {
+                renderResultCard(record.result, record.filename);
+            } else {
+                const status = record.error && record.error.startsWith('Unsupported format') ? 400 : 500;
+                renderErrorCard(record.filename, new Error(JSON.stringify({ status, msg: record.error })));
+            }
+        }
+    }
+    return true;
+}
+
 // --- HELPER FUNCTIONS ---
 function handleFiles(files) {
     currentFiles = Array.from(files);
@@ -224,7 +282,7 @@ function downloadText(filename, text) {
 
 // ✅ Result Card with Show Full/Collapse, Copy, and Download
 function renderResultCard(data, originalName) {
-    const fullText = data.content.map(u => u.text).join('\n\n');
+    const fullText = data.content.map(u => u.text).filter(t => t).join('\n\n');
     const isLong = fullText.length > 600;
     
     const shortText = isLong ? fullText.substring(0, 600) + "..." : fullText;
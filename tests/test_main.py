@@ -4,11 +4,26 @@ import os
 import time
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
+from app import config
 from app.main import app
+from app.cache import result_cache, ResultCache
+from app.jobs import JobQueue, QueueFullError
 
 # Create a test client
 client = TestClient(app)
 
+
+@pytest.fixture(autouse=True)
+def clear_result_cache():
+    """Every test starts cold so mocked extractors are always called."""
+    result_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def extract_in_process(monkeypatch):
+    """Mocks only exist in this process, so /api/extract must not hand work to its process pool."""
+    monkeypatch.setattr(config, "EXTRACT_POOL_WORKERS", 0)
+
 # Looks one level up from 'tests/' to find 'test_data/' in the project root
 EXTRA_FOLDER = os.path.join(os.path.dirname(__file__), "..", "test_data")
 
@@ -155,4 +170,939 @@ def test_extract_real_documents_cli(filename):
     else:
         print("  No text content found.")
     
-    print("=" * 70)
\ No newline at end of file
+    print("=" * 70)
+# ⚙️ SECTION 5: PERFORMANCE FEATURES
+
+def test_pdf_parallel_matches_sequential():
+    """Page-parallel PDF extraction returns the same units, in page order."""
+    from app import config
+    from app.extractors.documents import PDFExtractor
+
+    with open(os.path.join(EXTRA_FOLDER, "c4611_sample_explain.pdf"), "rb") as f:
+        pdf_bytes = f.read()
+
+    sequential = PDFExtractor(pdf_bytes, "doc.pdf", workers=1).extract()
+    with patch.object(config, "PDF_PARALLEL_MIN_PAGES", 1):
+        parallel = PDFExtractor(pdf_bytes, "doc.pdf", workers=2, max_workers_per_doc=2, pages_per_task=1).extract()
+
+    assert [u.source for u in parallel] == [u.source for u in sequential]
+    assert [u.text for u in parallel] == [u.text for u in sequential]
+
+
+def test_pdf_fans_out_only_past_the_threshold():
+    """Only PDFs that would fan out to the page pool stay off the extract pool."""
+    from benchmarks import corpus
+    from app.extractors.base import ExtractionLimits
+    from app.extractors.documents import PDFExtractor
+    from app.scheduler import _fans_out
+
+    _, pdf_bytes = corpus.native_pdf(pages=3)
+    extractor = PDFExtractor(pdf_bytes, "doc.pdf", workers=2)
+    with patch.object(config, "PDF_PARALLEL_MIN_PAGES", 3):
+        assert extractor.fans_out()
+        extractor.limits = ExtractionLimits(pages=[(2, 3)])
+        assert not extractor.fans_out()
+    with patch.object(config, "PDF_PARALLEL_MIN_PAGES", 4):
+        assert not _fans_out(PDFExtractor, "application/pdf", pdf_bytes, "doc.pdf", ExtractionLimits())
+    assert not PDFExtractor(b"not a pdf", "doc.pdf", workers=2).fans_out()
+
+
+@patch("app.main.magic.from_buffer")
+@patch("app.extractors.web.HTMLExtractor.extract")
+def test_extract_cache_hit(mock_extract, mock_magic):
+    """Re-uploading identical bytes is served from the cache."""
+    mock_magic.return_value = "text/html"
+    mock_extract.return_value = [{"text": "Cached", "source": "html_body", "location": {"type": "row", "number": 1}}]
+
+    files = {"file": ("page.html", b"<p>Cached</p>", "text/html")}
+    first = client.post("/api/extract", files=files)
+    second = client.post("/api/extract", files=files)
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json()["content"] == first.json()["content"]
+    assert mock_extract.call_count == 1
+    assert client.get("/api/cache/stats").json()["hits"] == 1
+
+    # Results made with other engine or OCR settings aren't reused
+    for name, value in (("HTML_ENGINE", "bs4"), ("OCR_TARGET_DPI", 200), ("OCR_PREPROCESS", ["downscale"])):
+        with patch.object(config, name, value):
+            assert client.post("/api/extract", files=files).headers["X-Cache"] == "MISS"
+    assert mock_extract.call_count == 4
+
+
+def test_result_cache_lru_and_disk_tier(tmp_path):
+    """Memory tier evicts by size; the SQLite tier still has the entry."""
+    payloads = {key: {"content": [os.urandom(60).hex()]} for key in "abc"}
+    cache = ResultCache(max_bytes=300, db_path=str(tmp_path / "cache.db"))
+    for key, value in payloads.items():
+        cache.put(key, value)
+    assert cache.stats()["memory_bytes"] <= 300
+    assert "a" not in cache._entries
+
+    reopened = ResultCache(max_bytes=300, db_path=str(tmp_path / "cache.db"))
+    assert reopened.get("a") == payloads["a"]
+
+
+@patch("app.main.magic.from_buffer")
+@patch("app.extractors.web.HTMLExtractor.extract")
+def test_job_lifecycle(mock_extract, mock_magic):
+    """POST /api/jobs returns at once; status and result are polled later."""
+    mock_magic.return_value = "text/html"
+    mock_extract.return_value = [{"text": "Later", "source": "html_body", "location": {"type": "row", "number": 1}}]
+
+    files = {"file": ("job.html", b"<p>Later</p>", "text/html")}
+    created = client.post("/api/jobs?priority=high", files=files)
+    assert created.status_code == 202
+    job_id = created.json()["job_id"]
+
+    for _ in range(100):
+        status = client.get(f"/api/jobs/{job_id}").json()["status"]
+        if status in ("done", "failed"):
+            break
+        time.sleep(0.05)
+
+    assert status == "done"
+    result = client.get(f"/api/jobs/{job_id}/result")
+    assert result.json()["content"][0]["text"] == "Later"
+    assert client.get("/api/jobs/unknown").status_code == 404
+
+
+def test_job_queue_sheds_load():
+    """Jobs beyond the queued-bytes budget are refused instead of piling up."""
+    queue = JobQueue(lambda *args: None, workers=1, max_queued_bytes=10)
+    with pytest.raises(QueueFullError):
+        queue.submit(b"x" * 11, "big.txt")
+
+
+def test_job_results_expire_by_size_and_age():
+    """Finished results are bounded in bytes and time; expired jobs keep their status but not the result."""
+    queue = JobQueue(lambda source, *args: bytes(source).decode(), workers=1, max_queued_bytes=1000,
+                     max_result_bytes=10, result_size=len)
+
+    def run(text):
+        job = queue.submit(text.encode(), "job.txt")
+        queue._queue.join()
+        return job
+
+    first, second = run("aaaa"), run("bbbb")
+    assert (first.status, second.status, queue.result_bytes) == ("done", "done", 8)
+    third = run("cccc")
+    assert (first.status, first.result) == ("expired", None)
+    assert second.result == "bbbb" and third.result == "cccc" and queue.result_bytes == 8
+    # A result over the whole budget is still kept while it is the newest
+    huge = run("x" * 50)
+    assert huge.result == "x" * 50 and second.status == third.status == "expired"
+
+    queue.result_ttl = 60
+    huge.finished_at -= 61
+    assert queue.get(huge.id).status == "expired" and queue.result_bytes == 0
+
+    # Over HTTP an expired result is gone, not pending
+    from app.main import job_queue
+    job = job_queue.submit(b"hello", "note.txt")
+    job_queue._queue.join()
+    with job_queue._lock:
+        job_queue._drop_result(job)
+    assert client.get(f"/api/jobs/{job.id}").json()["status"] == "expired"
+    assert client.get(f"/api/jobs/{job.id}/result").status_code == 410
+
+
+def test_extract_stream_ndjson():
+    """?stream=ndjson yields one line per unit plus a trailing summary."""
+    import json
+
+    html = b"<html><head><script>var x = 1;</script></head><body><h1>Title</h1><p>Body text</p></body></html>"
+    files = {"file": ("page.html", html, "text/html")}
+    response = client.post("/api/extract?stream=ndjson", files=files)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["text"] for r in records if r["type"] == "unit"] == ["Title", "Body text"]
+    assert records[-1]["type"] == "summary"
+    assert records[-1]["file_type"] == "html"
+    assert records[-1]["unit_count"] == 2
+    assert "processing_time_ms" in records[-1]
+
+
+def test_extract_stream_records_metrics():
+    """Streamed extractions count requests, bytes, units and time like the buffered path."""
+    from app.metrics import BYTES_IN, REQUEST_SECONDS, REQUESTS, UNITS_OUT
+
+    html_type = (("file_type", "html"),)
+
+    def snapshot():
+        return (REQUESTS._values.get(html_type + (("status", "ok"),), 0),
+                REQUESTS._values.get(html_type + (("status", "error"),), 0),
+                BYTES_IN._values.get(html_type, 0),
+                UNITS_OUT._values.get(html_type, 0),
+                REQUEST_SECONDS._series.get(html_type, [0] * (len(REQUEST_SECONDS.buckets) + 2))[-2])
+
+    def failing_units():
+        yield from ()
+        raise RuntimeError("boom")
+
+    html = b"<html><body><h1>Title</h1><p>Body text</p></body></html>"
+    before = snapshot()
+    client.post("/api/extract?stream=ndjson", files={"file": ("page.html", html, "text/html")})
+    with patch("app.extractors.web.HTMLExtractor.iter_limited", side_effect=lambda: failing_units()):
+        response = client.post("/api/extract?stream=ndjson", files={"file": ("bad.html", html + b" ", "text/html")})
+    assert '"type": "error"' in response.text
+    ok, errors, bytes_in, units_out, timed = (b - a for a, b in zip(before, snapshot()))
+
+    assert (ok, errors, units_out, timed) == (1, 1, 2, 1)
+    # Both uploads were read, the failed one included
+    assert bytes_in == len(html) * 2 + 1
+
+
+def test_extract_stream_unsupported_removes_spool_file(tmp_path, monkeypatch):
+    """A streamed upload that is rejected before the response starts doesn't leave its spool file behind."""
+    monkeypatch.setattr(config, "UPLOAD_SPOOL_DIR", str(tmp_path))
+    files = {"file": ("virus.exe", b"MZ\x90\x00", "application/octet-stream")}
+    response = client.post("/api/extract?stream=ndjson", files=files)
+
+    assert response.status_code == 400
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_upload_size_limit():
+    """Uploads over MAX_UPLOAD_BYTES are refused with 413."""
+    from app import config
+
+    with patch.object(config, "MAX_UPLOAD_BYTES", 1024):
+        files = {"file": ("big.csv", b"a,b\n" * 1000, "text/csv")}
+        response = client.post("/api/extract", files=files)
+    assert response.status_code == 413
+
+
+def test_spool_upload_is_memory_mapped(tmp_path):
+    """Spooled uploads are readable through the mmap and deleted on release."""
+    import io
+    from app import config
+    from app.uploads import UploadTooLargeError, read_header, release, spool_upload
+
+    with patch.object(config, "UPLOAD_SPOOL_DIR", str(tmp_path)):
+        source = spool_upload(io.BytesIO(b"%PDF-1.4 body"), max_bytes=100)
+        assert read_header(source, 8) == b"%PDF-1.4"
+        assert len(source) == 13
+        release(source)
+
+        with pytest.raises(UploadTooLargeError):
+            spool_upload(io.BytesIO(b"x" * 101), max_bytes=100)
+    assert os.listdir(tmp_path) == []
+
+
+def test_table_rows_vectorized_and_chunked():
+    """Vectorized row text matches the old iterrows output; chunk row numbers keep counting."""
+    from app.extractors.tables import TableExtractor
+
+    csv = b"1,2.5,hello\n3,,world\n,,\n4,5,\n"
+    units = TableExtractor(csv, "data.csv", is_csv=True).extract()
+    assert [(u.text, u.location.number) for u in units] == [
+        ("1.0 | 2.5 | hello", 1), ("3.0 | world", 2), ("4.0 | 5.0", 4)
+    ]
+
+    chunked = TableExtractor(b"a\nb\nc\nd\ne\n", "data.csv", is_csv=True, chunk_rows=2).extract()
+    assert [(u.text, u.location.number, u.location.sheet) for u in chunked] == [
+        ("a", 1, "csv"), ("b", 2, "csv"), ("c", 3, "csv"), ("d", 4, "csv"), ("e", 5, "csv")
+    ]
+
+    # A blank date cell renders as "NaT", like str() did per cell
+    import io
+    import datetime
+    import openpyxl
+    workbook = openpyxl.Workbook()
+    for row in [["when", "what"], [datetime.datetime(2024, 1, 2), "a"], [None, "b"]]:
+        workbook.active.append(row)
+    buf = io.BytesIO()
+    workbook.save(buf)
+    dated = TableExtractor(buf.getvalue(), "dates.xlsx", engine="pandas")
+    assert [u.text for u in dated.extract()] == ["2024-01-02 00:00:00 | a", "NaT | b"]
+    assert TableExtractor(buf.getvalue(), "dates.xlsx", engine="pandas").extract_columns().text == [
+        "2024-01-02 00:00:00 | a", "NaT | b"
+    ]
+
+
+def test_xlsx_streaming_engine_with_filters():
+    """The read-only XLSX engine keeps pandas' row numbering and honours sheets/max_rows."""
+    import io
+    import openpyxl
+    from app.extractors.tables import TableExtractor
+
+    workbook = openpyxl.Workbook()
+    first = workbook.active
+    first.title = "Keep"
+    for row in [["name", "qty"], ["apple", 3], [None, None], ["pear", 5], ["plum", 7]]:
+        first.append(row)
+    skipped = workbook.create_sheet("Skip")
+    skipped.append(["header"])
+    skipped.append(["ignored"])
+    buf = io.BytesIO()
+    workbook.save(buf)
+    xlsx = buf.getvalue()
+
+    streamed = TableExtractor(xlsx, "book.xlsx", engine="streaming").extract()
+    loaded = TableExtractor(xlsx, "book.xlsx", engine="pandas").extract()
+    assert [u.location for u in streamed] == [u.location for u in loaded]
+    assert [u.text for u in streamed] == ["apple | 3", "pear | 5", "plum | 7", "ignored"]
+
+    limited = TableExtractor(xlsx, "book.xlsx", engine="streaming", sheets=["Keep"], max_rows=3).extract()
+    assert [(u.text, u.location.number, u.location.sheet) for u in limited] == [
+        ("apple | 3", 1, "Keep"), ("pear | 5", 3, "Keep")
+    ]
+
+
+def test_pdf_native_image_decoding():
+    """Embedded JPEG/indexed images decode from their streams and match the bytes-based preprocessor."""
+    import cv2
+    import numpy as np
+    import pdfplumber
+    from app.extractors.documents import _native_image_array
+    from app.utils import preprocess_array_for_ocr, preprocess_image_for_ocr
+
+    for name in ("PDF_TestPage.pdf", "c4611_sample_explain.pdf"):
+        with pdfplumber.open(os.path.join(EXTRA_FOLDER, name)) as pdf:
+            img = pdf.pages[0].images[0]
+            pixels, channel_order = _native_image_array(img)
+            assert pixels.shape[:2] == (img["srcsize"][1], img["srcsize"][0])
+
+    rgb = np.random.randint(0, 255, (40, 60, 3), dtype=np.uint8)
+    _, png = cv2.imencode(".png", rgb[:, :, ::-1])
+    from_bytes = np.asarray(preprocess_image_for_ocr(png.tobytes()))
+    from_array = np.asarray(preprocess_array_for_ocr(rgb, "RGB"))
+    assert np.array_equal(from_bytes, from_array)
+
+
+def test_ocr_engine_batch_keeps_order():
+    """Batched OCR returns one string per image, in input order."""
+    from PIL import Image
+    from app.ocr import PytesseractEngine
+
+    images = [Image.new("L", (10, 10), color=shade) for shade in (0, 100, 200)]
+    with patch("app.ocr.pytesseract.image_to_string", side_effect=lambda im: f"shade {im.getpixel((0, 0))}"):
+        texts = PytesseractEngine(workers=3).image_to_string_batch(images)
+    assert texts == ["shade 0", "shade 100", "shade 200"]
+
+
+def test_repeated_images_are_ocrd_once():
+    """The same image in several paragraphs hits the OCR engine a single time."""
+    import io
+    import cv2
+    import docx
+    import numpy as np
+    from app.extractors.documents import WordExtractor
+    from app.ocr import ocr_cache
+
+    ocr_cache.clear()
+    _, png = cv2.imencode(".png", np.random.randint(0, 255, (30, 30, 3), dtype=np.uint8))
+    document = docx.Document()
+    for _ in range(3):
+        document.add_picture(io.BytesIO(png.tobytes()))
+    buf = io.BytesIO()
+    document.save(buf)
+
+    with patch("app.extractors.documents.ocr_images", side_effect=lambda images: ["ACME Corp"] * len(images)) as mock_ocr:
+        units = WordExtractor(buf.getvalue(), "letter.docx").extract()
+
+    assert mock_ocr.call_count == 1
+    assert len(mock_ocr.call_args[0][0]) == 1
+    assert [u.text for u in units] == ["[Image Extraction]: ACME Corp"] * 3
+
+    # A failing OCR engine skips the images, not the document
+    ocr_cache.clear()
+    document.add_paragraph("After")
+    buf = io.BytesIO()
+    document.save(buf)
+    for engine in ("streaming", "python-docx"):
+        with patch("app.extractors.documents.ocr_images", side_effect=RuntimeError("tesseract missing")), \
+                patch("app.extractors.documents.ocr_image", side_effect=RuntimeError("tesseract missing")):
+            assert [u.text for u in WordExtractor(buf.getvalue(), "letter.docx", engine=engine).extract()] == ["After"]
+
+
+def test_batch_extract_files_and_zip():
+    """Batch accepts plain files and zips; every file gets its own result and timings."""
+    import io
+    import zipfile
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("inner.csv", "a,b\n1,2\n")
+        zf.writestr("notes/page.html", "<html><body><p>Zipped</p></body></html>")
+
+    files = [
+        ("files", ("one.csv", b"x,y\n", "text/csv")),
+        ("files", ("bundle.zip", archive.getvalue(), "application/zip")),
+        ("files", ("virus.exe", b"MZ\x90\x00", "application/octet-stream")),
+    ]
+    response = client.post("/api/extract/batch", files=files)
+
+    assert response.status_code == 200
+    items = {item["filename"]: item for item in response.json()["items"]}
+    assert set(items) == {"one.csv", "inner.csv", "page.html", "virus.exe"}
+    assert items["page.html"]["result"]["content"][0]["text"] == "Zipped"
+    assert items["inner.csv"]["status"] == "ok"
+    assert items["virus.exe"]["status"] == "error"
+    assert all("queued_ms" in item and "processing_time_ms" in item for item in items.values())
+
+
+def test_batch_byte_cap_covers_all_zip_members(tmp_path, monkeypatch):
+    """Members that each fit MAX_UPLOAD_BYTES are still refused once the batch adds up past BATCH_MAX_BYTES."""
+    import io
+    import zipfile
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        for n in range(4):
+            zf.writestr(f"part{n}.csv", "a,b\n" * 250)
+
+    monkeypatch.setattr(config, "UPLOAD_SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "MAX_UPLOAD_BYTES", 2000)
+    monkeypatch.setattr(config, "BATCH_MAX_BYTES", 3500)
+    files = [("files", ("bundle.zip", archive.getvalue(), "application/zip"))]
+    response = client.post("/api/extract/batch", files=files)
+
+    assert response.status_code == 413
+    assert "3500 byte limit" in response.json()["detail"]
+    # Members spooled before the cap was hit are cleaned up
+    assert list(tmp_path.iterdir()) == []
+
+    # Plain files count toward the same total
+    monkeypatch.setattr(config, "BATCH_MAX_BYTES", 1500)
+    plain = [("files", (f"f{n}.csv", b"a,b\n" * 250, "text/csv")) for n in range(2)]
+    assert client.post("/api/extract/batch", files=plain).status_code == 413
+
+
+def test_batch_body_may_exceed_max_upload_bytes(monkeypatch):
+    """A batch is held to BATCH_MAX_BYTES as a whole, not to the single-upload limit."""
+    monkeypatch.setattr(config, "MAX_UPLOAD_BYTES", 100_000)
+    monkeypatch.setattr(config, "BATCH_MAX_BYTES", 1_000_000)
+    files = [("files", (f"f{n}.csv", b"1,2\n" * 20_000, "text/csv")) for n in range(3)]
+
+    response = client.post("/api/extract/batch", files=files)
+
+    assert response.status_code == 200
+    assert [item["status"] for item in response.json()["items"]] == ["ok"] * 3
+    # A single upload of the same size is still refused
+    assert client.post("/api/extract", files={"file": ("big.csv", b"1,2\n" * 60_000, "text/csv")}).status_code == 413
+
+
+def test_memory_budget_admits_oversized_job_alone():
+    """A reservation bigger than the budget still runs once nothing else holds memory."""
+    from app.scheduler import MemoryBudget
+
+    budget = MemoryBudget(max_bytes=10)
+    with budget.reserve(50):
+        assert budget.reserved == 50
+    assert budget.reserved == 0
+
+
+def test_scanned_pdf_skips_blank_pages_and_adapts_dpi():
+    """Blank scanned pages skip OCR; text pages report the DPI that was chosen."""
+    import io
+    import json
+    from PIL import Image, ImageDraw, ImageFont
+    from app.extractors.documents import PDFExtractor
+
+    blank = Image.new("RGB", (850, 1100), "white")
+    text_page = Image.new("RGB", (850, 1100), "white")
+    draw = ImageDraw.Draw(text_page)
+    font = ImageFont.load_default(size=36)
+    for line in range(12):
+        draw.text((80, 100 + line * 70), "Large scanned words here", fill="black", font=font)
+    buf = io.BytesIO()
+    blank.save(buf, format="PDF", save_all=True, append_images=[blank, text_page], resolution=100)
+
+    with patch("app.extractors.documents.ocr_image", return_value="Large scanned words") as mock_ocr:
+        extractor = PDFExtractor(buf.getvalue(), "scan.pdf", workers=1)
+        units = extractor.extract()
+
+    assert mock_ocr.call_count == 1
+    # No empty units; the skipped pages are reported for the document
+    assert [unit.source for unit in units] == ["page_3_full_ocr"]
+    assert extractor.skipped_pages == [1, 2]
+    assert 150 <= units[0].metadata["ocr_dpi"] < 300
+
+    # Trailing blank pages (or nothing but blank pages) are reported too
+    trailing = io.BytesIO()
+    text_page.copy().save(trailing, format="PDF", save_all=True, append_images=[blank.copy(), blank.copy()], resolution=100)
+    only_blank = io.BytesIO()
+    blank.copy().save(only_blank, format="PDF", resolution=100)
+    with patch("app.extractors.documents.ocr_image", return_value="Large scanned words"):
+        response = client.post("/api/extract", files={"file": ("scan.pdf", trailing.getvalue(), "application/pdf")}).json()
+        streamed = client.post("/api/extract?stream=ndjson",
+                               files={"file": ("blank.pdf", only_blank.getvalue(), "application/pdf")})
+    assert [unit["source"] for unit in response["content"]] == ["page_1_full_ocr"]
+    assert response["skipped_pages"] == [2, 3]
+    summary = json.loads(streamed.text.splitlines()[-1])
+    assert summary["unit_count"] == 0 and summary["skipped_pages"] == [1]
+
+
+def test_metrics_and_stage_timings():
+    """?timings=true returns a per-stage breakdown and /metrics exposes the histograms."""
+    html = b"<html><body><p>Timed paragraph</p></body></html>"
+    response = client.post(
+        "/api/extract?timings=true",
+        files={"file": ("timed.html", html, "text/html")}
+    )
+    assert response.status_code == 200
+    timings = response.json()["timings"]
+    assert "mime_sniff" in timings and "parse" in timings
+
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200
+    assert 'extractor_requests_total{file_type="html",status="ok"}' in metrics.text
+    assert 'extractor_stage_duration_seconds_count{stage="parse"}' in metrics.text
+    assert "extractor_request_duration_seconds_bucket" in metrics.text
+
+
+def test_benchmark_corpus_is_deterministic_and_parseable():
+    """Synthetic benchmark files are reproducible from their seed and extract cleanly."""
+    from app.extractors.documents import PDFExtractor, WordExtractor
+    from app.extractors.web import HTMLExtractor
+    from benchmarks import corpus
+
+    name, pdf = corpus.native_pdf(pages=2, seed=7, lines_per_page=5)
+    assert corpus.native_pdf(pages=2, seed=7, lines_per_page=5) == (name, pdf)
+    units = PDFExtractor(pdf, name, workers=1).extract()
+    assert [unit.source for unit in units] == ["page_1", "page_2"]
+
+    name, data = corpus.docx_file(paragraphs=10, tables=1, table_rows=2)
+    assert len(WordExtractor(data, name).extract()) >= 10
+
+    name, data = corpus.html_file(paragraphs=5)
+    texts = [unit.text for unit in HTMLExtractor(data, name).extract()]
+    assert "Section 0" in texts and not any("var x" in text for text in texts)
+
+
+def test_docx_streaming_matches_python_docx():
+    """The iterparse DOCX path gives the python-docx units, merged table cells included."""
+    import io
+    import docx
+    from app.extractors.documents import WordExtractor
+
+    document = docx.Document()
+    document.add_paragraph("Dear ").add_run("customer")
+    document.add_paragraph("")
+    table = document.add_table(rows=3, cols=3)
+    table.cell(0, 0).merge(table.cell(0, 1)).text = "Header"
+    table.cell(1, 2).merge(table.cell(2, 2)).text = "Total"
+    table.cell(1, 0).text = "Item A"
+    document.add_paragraph("Line one").add_run().add_break()
+    buf = io.BytesIO()
+    document.save(buf)
+
+    legacy = WordExtractor(buf.getvalue(), "a.docx", engine="python-docx").extract()
+    streamed = WordExtractor(buf.getvalue(), "a.docx", engine="streaming").extract()
+
+    assert [u.model_dump() for u in streamed] == [u.model_dump() for u in legacy]
+    assert [u.text for u in streamed if u.source == "table_1"] == ["Header | Header", "Item A | Total", "Total"]
+
+
+def test_html_streaming_matches_bs4():
+    """The incremental tokenizer yields the BeautifulSoup lines, even across chunk boundaries."""
+    from app.extractors.web import HTMLExtractor
+
+    html = (
+        "<html><head><title>Q3 &amp; Q4</title><meta charset='utf-8'><style>p { color: red }</style></head>"
+        "<body><p>Total: <b>500 €</b></p><!-- note --><noscript><p>Enable JS</p></noscript>"
+        "<script>var s = '<p>fake</p>';</script><div>a<br>b</div>\n\n  tail  </body></html>"
+    ).encode("utf-8")
+
+    legacy = [u.text for u in HTMLExtractor(html, "page.html", engine="bs4").extract()]
+    with patch("app.extractors.web.CHUNK_SIZE", 7):
+        streamed = [u.text for u in HTMLExtractor(html, "page.html", engine="streaming").extract()]
+
+    assert streamed == legacy == ["Q3 & Q4", "Total:", "500 €", "a", "b", "tail"]
+
+    # CDATA is kept, <template> and ruby annotations aren't, and an end tag closes what was left open inside it
+    tricky = (b"<p>a</p><![CDATA[ kept ]]><template><p>t</p></template><ruby>x<rt>y</ruby>"
+              b"<div><noscript>n<p>m</div>after<br>c</br>d")
+    with patch("app.extractors.web.CHUNK_SIZE", 5):
+        streamed = [u.text for u in HTMLExtractor(tricky, "page.html", engine="streaming").extract()]
+    assert streamed == [u.text for u in HTMLExtractor(tricky, "page.html", engine="bs4").extract()] == [
+        "a", "kept", "x", "after", "cd"]
+
+    # Thousands of unclosed <p>s followed by stray end tags: each end tag is a counter lookup, not a scan
+    from collections import Counter
+    from app.extractors.web import _TextTokenizer
+    tokenizer = _TextTokenizer()
+    tokenizer.feed("<div>" + "<p>x" * 20000 + "</span>" * 20000 + "</div>tail")
+    tokenizer.close()
+    assert len(tokenizer.lines) == 20001 and tokenizer.lines[-1] == "tail"
+    assert tokenizer._open == [] and +tokenizer._open_counts == Counter()
+
+
+def test_cold_start_imports_no_extractor_libraries():
+    """Importing the app stays cheap: parsing/OCR libraries load on first use, not at startup."""
+    import json
+    import subprocess
+    import sys
+
+    probe = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import app.main\n"
+        "elapsed = time.perf_counter() - start\n"
+        "heavy = ['pandas', 'cv2', 'pdfplumber', 'docx', 'bs4', 'pytesseract', 'openpyxl']\n"
+        "print(json.dumps({'seconds': elapsed, 'loaded': [m for m in heavy if m in sys.modules]}))\n"
+    )
+    root = os.path.join(os.path.dirname(__file__), "..")
+    output = subprocess.run([sys.executable, "-c", probe], cwd=root, capture_output=True, text=True, check=True)
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+
+    print(f"\n[STARTUP] import app.main took {result['seconds'] * 1000:.0f} ms")
+    assert result["loaded"] == []
+    assert result["seconds"] < float(os.environ.get("STARTUP_BUDGET_SECONDS", "5"))
+
+
+def test_registry_warm_up_and_extension_fallback():
+    """warm_up() imports only the requested formats; unknown headers fall back to the extension."""
+    from app.extractors.registry import registry
+
+    timings = registry.warm_up(["html"])
+    assert list(timings) == ["app.extractors.web"]
+
+    spec, mime_type = registry.for_filename("REPORT.CSV")
+    assert mime_type == "text/csv" and spec.options == {"is_csv": True}
+    assert registry.file_type("image/jpeg") == "jpg"
+    assert registry.for_filename("notes.rtf") is None
+
+
+def test_columnar_format_matches_default_json():
+    """?format=columnar (or the Accept header) returns the same units as parallel arrays."""
+    csv = b"name,qty\nwidget,3\n,\ngadget,5\n"
+    files = {"file": ("stock.csv", csv, "text/csv")}
+
+    columnar = client.post("/api/extract?format=columnar", files=files)
+    # Served from the cache entry the columnar request stored
+    default = client.post("/api/extract", files=files).json()
+    cached = client.post("/api/extract", files=files, headers={"Accept": "application/vnd.extractor.columnar+json"})
+
+    assert [unit["text"] for unit in default["content"]] == ["name | qty", "widget | 3", "gadget | 5"]
+    assert columnar.headers["content-type"].startswith("application/vnd.extractor.columnar+json")
+    body = columnar.json()
+    assert body["format"] == "columnar" and body["count"] == len(default["content"])
+    assert body["columns"]["text"] == [unit["text"] for unit in default["content"]]
+    assert body["columns"]["location_number"] == [unit["location"]["number"] for unit in default["content"]]
+    assert body["columns"]["metadata"] is None
+    assert cached.headers["X-Cache"] == "HIT" and cached.json()["columns"] == body["columns"]
+
+
+def test_partial_extraction_pages_and_max_units():
+    """?pages= only touches the selected pages; ?max_units= stops early and flags the result."""
+    from benchmarks import corpus
+
+    name, pdf = corpus.native_pdf(pages=6, lines_per_page=3)
+    files = {"file": (name, pdf, "application/pdf")}
+
+    selected = client.post("/api/extract?pages=2,4-5", files=files).json()
+    assert [unit["location"]["number"] for unit in selected["content"]] == [2, 4, 5]
+    assert selected["truncated"] is False
+
+    limited = client.post("/api/extract?max_units=2", files=files).json()
+    assert len(limited["content"]) == 2 and limited["truncated"] is True
+
+    assert client.post("/api/extract?pages=5-2", files=files).status_code == 400
+
+
+def test_max_units_exact_count_is_not_truncated():
+    """A document with exactly max_units units is complete; one more unit makes it truncated."""
+    from app.extractors.base import ExtractionLimits
+    from app.extractors.tables import TableExtractor
+    from app.extractors.web import HTMLExtractor
+
+    for max_units, truncated in ((3, False), (2, True)):
+        html = HTMLExtractor(b"<p>a</p><p>b</p><p>c</p>", "page.html")
+        html.limits = ExtractionLimits(max_units=max_units)
+        assert len(html.extract()) == max_units and html.truncated is truncated
+
+        # Two-row chunks: the limit is reached in one block, the answer only comes with the next
+        table = TableExtractor(b"1\n2\n3\n", "data.csv", is_csv=True, chunk_rows=2)
+        table.limits = ExtractionLimits(max_units=max_units)
+        columns = table.extract_columns()
+        assert columns.text == ["1", "2", "3"][:max_units] and table.truncated is truncated
+
+    # The block after the limit only has empty rows, so nothing is left
+    for max_units, truncated in ((2, False), (1, True)):
+        table = TableExtractor(b"1,a\n2,b\n,\n,\n", "data.csv", is_csv=True, chunk_rows=2)
+        table.limits = ExtractionLimits(max_units=max_units)
+        assert [u.text for u in table.extract()] == ["1 | a", "2 | b"][:max_units] and table.truncated is truncated
+
+
+def test_max_units_stops_before_the_next_page_is_ocrd():
+    """Reaching max_units doesn't OCR another page just to tell whether more follow."""
+    import io
+    from PIL import Image, ImageDraw, ImageFont
+    from app.extractors.base import ExtractionLimits
+    from app.extractors.documents import PDFExtractor
+    from app.ocr import ocr_cache
+
+    pages = []
+    for number in range(4):
+        page = Image.new("RGB", (850, 1100), "white")
+        draw = ImageDraw.Draw(page)
+        for line in range(12 - number):
+            draw.text((80, 100 + line * 70), "Large scanned words here", fill="black", font=ImageFont.load_default(size=36))
+        pages.append(page)
+    buf = io.BytesIO()
+    pages[0].save(buf, format="PDF", save_all=True, append_images=pages[1:], resolution=100)
+
+    for max_units, ocr_calls, truncated in ((1, 1, True), (4, 4, False)):
+        ocr_cache.clear()
+        extractor = PDFExtractor(buf.getvalue(), "scan.pdf", workers=1)
+        extractor.limits = ExtractionLimits(max_units=max_units)
+        with patch("app.extractors.documents.ocr_image", return_value="Large scanned words") as mock_ocr:
+            units = extractor.extract()
+        assert len(units) == max_units and mock_ocr.call_count == ocr_calls and extractor.truncated is truncated
+
+
+def test_partial_extraction_time_limit_and_sheets():
+    """max_time_ms stops before the next page; sheets= skips whole workbook sheets."""
+    import io
+    import pandas as pd
+    from app.extractors.base import ExtractionLimits
+    from app.extractors.documents import PDFExtractor, _extract_pdf_page
+    from app.extractors.tables import TableExtractor
+    from benchmarks import corpus
+
+    def slow_page(*args):
+        time.sleep(0.05)
+        return _extract_pdf_page(*args)
+
+    name, pdf = corpus.native_pdf(pages=5, lines_per_page=3)
+    extractor = PDFExtractor(pdf, name, workers=1)
+    extractor.limits = ExtractionLimits(max_time_ms=20)
+    with patch("app.extractors.documents._extract_pdf_page", side_effect=slow_page) as mock_page:
+        units = extractor.extract()
+    assert extractor.truncated and len(units) == 1 and mock_page.call_count == 1
+
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
+        pd.DataFrame({"a": [1, 2]}).to_excel(writer, sheet_name="Summary", index=False)
+        pd.DataFrame({"b": [3, 4]}).to_excel(writer, sheet_name="Raw", index=False)
+    tables = TableExtractor(buf.getvalue(), "book.xlsx")
+    tables.limits = ExtractionLimits(sheets=["Raw"], max_units=1)
+    columns = tables.extract_columns()
+    assert columns.text == ["3"] and columns.location_sheet == ["Raw"] and tables.truncated
+
+
+def test_extract_runs_in_process_pool(monkeypatch):
+    """With EXTRACT_POOL_WORKERS set, non-PDF uploads are parsed in a worker process, same result."""
+    from benchmarks import corpus
+
+    name, html = corpus.html_file(paragraphs=50)
+    files = {"file": (name, html, "text/html")}
+    in_thread = client.post("/api/extract?timings=true", files=files).json()
+
+    result_cache.clear()
+    monkeypatch.setattr(config, "EXTRACT_POOL_WORKERS", 1)
+    with patch("app.scheduler.extract_in_thread") as mock_thread:
+        pooled = client.post("/api/extract?timings=true", files=files).json()
+
+    mock_thread.assert_not_called()
+    assert pooled["content"] == in_thread["content"]
+    # The worker's stages are merged into the request's breakdown
+    assert "parse" in pooled["timings"] and "mime_sniff" in pooled["timings"]
+
+
+def _pool_worker_flag():
+    from app import pools
+    return pools.in_worker
+
+
+def test_process_pools_reset_signals_and_shut_down():
+    """Pool workers don't inherit the server's signal handlers, and shutdown_pools() stops every pool."""
+    import signal
+    from app import pools
+    from app.pools import ProcessPool, shutdown_pools
+
+    pool = ProcessPool()
+    previous = signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    try:
+        handler = pool.get(1).submit(signal.getsignal, signal.SIGTERM).result()
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+    assert handler == signal.SIG_DFL
+    # Workers know they are pool workers; this process (a server worker, say) doesn't
+    assert pool.get(1).submit(_pool_worker_flag).result() is True
+    assert pools.in_worker is False
+
+    executor = pool.get(1)
+    shutdown_pools()
+    with pytest.raises(RuntimeError):
+        executor.submit(abs, -1)
+    assert pool.get(1) is not executor
+    pool.shutdown()
+
+
+def test_extract_gate_sheds_load():
+    """A format at its limit queues up to max_waiting requests, then refuses with QueueFullError."""
+    import asyncio
+    from app.scheduler import ExtractGate
+
+    gate = ExtractGate(heavy_limit=1, light_limit=4, overrides={}, max_waiting=1)
+
+    async def scenario():
+        release_first = asyncio.Event()
+
+        async def hold():
+            async with gate.admit("pdf", "application/pdf"):
+                await release_first.wait()
+
+        first = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert gate.stats()["pdf"] == {"limit": 1, "running": 1, "waiting": 1}
+        with pytest.raises(QueueFullError):
+            async with gate.admit("pdf", "application/pdf"):
+                pass
+        # Other formats have their own slots
+        async with gate.admit("csv", "text/csv"):
+            assert gate.stats()["csv"]["limit"] == 4
+        release_first.set()
+        await asyncio.gather(first, second)
+
+    asyncio.run(scenario())
+
+
+@patch("app.main.magic.from_buffer")
+def test_extract_returns_503_when_queue_full(mock_magic):
+    """A full waiting line answers 503 + Retry-After instead of queueing."""
+    from contextlib import asynccontextmanager
+
+    @asynccontextmanager
+    async def full(file_type, mime_type):
+        raise QueueFullError(f"Too many {file_type} extractions queued, retry later")
+        yield
+
+    mock_magic.return_value = "text/html"
+    # Streamed requests go through the same gate
+    for url in ("/api/extract", "/api/extract?stream=ndjson"):
+        with patch("app.main.extract_gate.admit", side_effect=full):
+            response = client.post(url, files={"file": ("page.html", b"<p>hi</p>", "text/html")})
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(config.EXTRACT_RETRY_AFTER)
+
+
+def test_preprocess_pipeline_downscale_and_batch():
+    """Oversized images shrink to the target DPI; batches keep order and flag unreadable images."""
+    import io
+    import cv2
+    import numpy as np
+    from PIL import Image
+    from app.utils import PreprocessPipeline, preprocess_images_for_ocr
+
+    pipeline = PreprocessPipeline(("downscale", "otsu"), target_dpi=300)
+    scan = Image.new("L", (2400, 3000), color=255)
+    buf = io.BytesIO()
+    scan.save(buf, format="PNG", dpi=(600, 600))
+    assert pipeline.from_bytes(buf.getvalue()).size == (1200, 1500)
+
+    # No DPI stated: capped at a letter page at the target DPI (3300px on the long side)
+    photo = np.full((3000, 4400, 3), 200, dtype=np.uint8)
+    _, jpg = cv2.imencode(".jpg", photo)
+    assert max(pipeline.from_bytes(jpg.tobytes()).size) == 3300
+    assert PreprocessPipeline(("otsu",)).from_bytes(jpg.tobytes()).size == (4400, 3000)
+
+    images = preprocess_images_for_ocr([buf.getvalue(), b"not an image", jpg.tobytes()])
+    assert images[0].size == (1200, 1500) and images[1] is None and images[2].mode == "L"
+
+    with pytest.raises(ValueError):
+        PreprocessPipeline(("otsu", "adaptive"))
+    with pytest.raises(ValueError):
+        PreprocessPipeline(("sharpen",))
+
+
+def test_preprocess_pipeline_deskew():
+    """The deskew step straightens text rotated by a few degrees."""
+    import cv2
+    import numpy as np
+    from app.utils import PreprocessPipeline
+
+    page = np.full((800, 700), 255, dtype=np.uint8)
+    for i in range(12):
+        cv2.putText(page, "The quick brown fox jumps", (40, 60 + i * 55), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2)
+    skewed = cv2.warpAffine(page, cv2.getRotationMatrix2D((350, 400), 4, 1.0), (700, 800), borderValue=255)
+
+    def row_contrast(image):
+        # Straight lines of text give sharply alternating ink / blank rows
+        return ((np.asarray(image) < 128).sum(axis=1)).var()
+
+    straightened = PreprocessPipeline(("deskew", "otsu")).from_array(skewed)
+    assert row_contrast(straightened) > 2 * row_contrast(PreprocessPipeline(("otsu",)).from_array(skewed))
+
+
+def test_multipage_tiff_pages_become_units():
+    """Every TIFF frame is OCR'd as its own page; fax resolution is squared, ?pages= applies."""
+    import io
+    from PIL import Image
+    from app.extractors.base import ExtractionLimits
+    from app.extractors.images import ImageExtractor
+
+    frames = [Image.new("L", (400, 200), color=shade) for shade in (0, 100, 200)]
+    buf = io.BytesIO()
+    frames[0].save(buf, format="TIFF", save_all=True, append_images=frames[1:], dpi=(200, 100))
+
+    def fake_ocr(images):
+        return [f"page of {im.size[0]}x{im.size[1]}" for im in images]
+
+    with patch("app.extractors.images.ocr_images", side_effect=fake_ocr):
+        units = ImageExtractor(buf.getvalue(), "fax.tiff").extract()
+        selected = ImageExtractor(buf.getvalue(), "fax.tiff")
+        selected.limits = ExtractionLimits(pages=[(2, 3)])
+        selected_units = selected.extract()
+
+    assert [unit.location.number for unit in units] == [1, 2, 3]
+    assert units[0].source == "page_1" and units[0].location.type == "page"
+    # 200x100 DPI: rows are doubled so the pixels are square again
+    assert units[0].text == "page of 400x400"
+    assert [unit.location.number for unit in selected_units] == [2, 3]
+
+
+def test_multiframe_jpeg_is_one_image():
+    """An MPO camera JPEG carries a preview frame; it is OCR'd once, not split into pages."""
+    import io
+    from PIL import Image
+    from app.extractors.images import ImageExtractor
+
+    photo = Image.new("RGB", (64, 64), color="white")
+    buf = io.BytesIO()
+    photo.save(buf, format="MPO", save_all=True, append_images=[photo.copy()])
+    assert Image.open(io.BytesIO(buf.getvalue())).n_frames == 2
+
+    with patch("app.extractors.images.ocr_images", side_effect=lambda images: ["photo text"] * len(images)) as ocr:
+        units = ImageExtractor(buf.getvalue(), "photo.jpg").extract()
+
+    assert [(unit.source, unit.location.type) for unit in units] == [("ocr_engine", "pixel_box")]
+    assert ocr.call_count == 1
+
+
+def test_large_image_is_read_in_bands(monkeypatch):
+    """Images over OCR_TILE_PIXELS are OCR'd in overlapping bands; lines read twice are merged."""
+    import cv2
+    import numpy as np
+    from app.extractors.images import ImageExtractor, _merge_bands
+
+    assert _merge_bands(["alpha\nbeta\ngamma", "gamma\ndelta", "epsilon"]) == "alpha\nbeta\ngamma\ndelta\nepsilon"
+    assert _merge_bands(["one\n\ntwo", "two\nthree"]) == "one\n\ntwo\nthree"
+
+    monkeypatch.setattr(config, "OCR_TILE_PIXELS", 100 * 200)
+    monkeypatch.setattr(config, "OCR_TILE_OVERLAP_PX", 20)
+    image = np.full((1000, 100), 255, dtype=np.uint8)
+    _, png = cv2.imencode(".png", image)
+
+    seen = []
+
+    def fake_ocr(images):
+        seen.extend(im.size for im in images)
+        return [f"band {len(seen) - len(images) + i}" for i in range(len(images))]
+
+    with patch("app.extractors.images.ocr_images", side_effect=fake_ocr):
+        units = ImageExtractor(png.tobytes(), "tall.png").extract()
+
+    assert all(width == 100 and height <= 200 for width, height in seen) and len(seen) == 6
+    assert len(units) == 1 and units[0].source == "ocr_engine"
+    assert units[0].text.splitlines() == [f"band {i}" for i in range(6)]